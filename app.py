@@ -4,8 +4,9 @@ Video-Audio Merger Web Service
 Standalone Flask app with FFmpeg
 """
 
-from flask import Flask, request, send_file, render_template_string, jsonify
+from flask import Flask, request, send_file, render_template_string, jsonify, Response, stream_with_context
 import os
+import sys
 import subprocess
 import uuid
 import json
@@ -15,8 +16,20 @@ from datetime import datetime, timedelta
 import threading
 import time
 from pathlib import Path
-import zipfile
-from io import BytesIO
+import struct
+import zlib
+import hashlib
+import fcntl
+import shutil
+from functools import lru_cache
+from fractions import Fraction
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import deque
+import heapq
+import math
+import sqlite3
+import socket
+from contextlib import contextmanager
 
 app = Flask(__name__)
 
@@ -25,8 +38,73 @@ UPLOAD_FOLDER = '/tmp/uploads'
 OUTPUT_FOLDER = '/tmp/output'
 MAX_FILE_SIZE = 500 * 1024 * 1024  # 500 MB
 CLEANUP_AGE_HOURS = 24
+# Encode video and mux audio in one ffmpeg invocation (no temporary video-only file)
+SINGLE_PASS_ENCODE = os.environ.get('SINGLE_PASS_ENCODE', '1') != '0'
+# Uploaded audio in these codecs is stream-copied into the MP4, anything else is encoded to AAC
+MP4_COPY_AUDIO_CODECS = ('aac', 'mp3')
+AUDIO_BITRATE = os.environ.get('AUDIO_BITRATE', '96k')  # AAC bitrate when the audio has to be encoded
+# Parallel segmented encoding of long timelines (segments are joined by stream copy)
+SEGMENT_ENCODE_WORKERS = int(os.environ.get('SEGMENT_ENCODE_WORKERS', max(1, (os.cpu_count() or 1) // 2)))
+SEGMENT_DURATION = int(os.environ.get('SEGMENT_DURATION', 120))  # seconds per segment
+SEGMENTED_ENCODE_MIN_DURATION = int(os.environ.get('SEGMENTED_ENCODE_MIN_DURATION', 600))  # seconds
+IMAGE_FRAME_RATE = 25  # ffmpeg default for looped still images
+# Output cap: frames are scaled into a 16:9 box of this height (either orientation) and limited to
+# this frame rate before the effect chain, so effects never run at upload size. 0 keeps the source.
+# The defaults match the H.264 level 4.2 the encodes target (1080p60); jobs can pass their own cap.
+DEFAULT_MAX_HEIGHT = int(os.environ.get('DEFAULT_MAX_HEIGHT', 1080))
+DEFAULT_MAX_FPS = int(os.environ.get('DEFAULT_MAX_FPS', 60))
+# Images without an effect: a short clip at a low frame rate is encoded once and looped by stream copy
+STILL_IMAGE_FRAME_RATE = int(os.environ.get('STILL_IMAGE_FRAME_RATE', 1))
+STILL_IMAGE_LOOP_SECONDS = int(os.environ.get('STILL_IMAGE_LOOP_SECONDS', 60))  # length of the looped clip, one GOP
+# Periodic effects on images are rendered for whole periods, at least this long, and looped by stream copy
+EFFECT_LOOP_MIN_SECONDS = int(os.environ.get('EFFECT_LOOP_MIN_SECONDS', 10))
+TRIM_WORKERS = int(os.environ.get('TRIM_WORKERS', 4))  # concurrent clip trimming/probing
+AUDIO_MERGE_WORKERS = int(os.environ.get('AUDIO_MERGE_WORKERS', os.cpu_count() or 1))  # parallel per-file audio conversion
+TRACKLIST_WORKERS = int(os.environ.get('TRACKLIST_WORKERS', max(1, (os.cpu_count() or 1) // 2)))  # parallel silence analysis chunks
+TRACKLIST_CHUNK_DURATION = int(os.environ.get('TRACKLIST_CHUNK_DURATION', 600))  # seconds of audio per analysis chunk
+TRACKLIST_SAMPLE_RATE = 8000  # Hz, mono; enough to find silences
+# 'outpoint': trim via concat list directives (no intermediate files, frame-exact)
+# 'rewrite': write a trimmed copy of every clip (legacy)
+TRIM_MODE = os.environ.get('TRIM_MODE', 'outpoint')
+PROBE_CACHE_SIZE = 512  # cached ffprobe results (keyed by path, size, mtime, inode)
+PROGRESS_UPDATE_INTERVAL = 2  # seconds between status updates while ffmpeg runs
+FFMPEG_STDERR_TAIL_LINES = 50  # stderr lines kept for error messages
+# Job scheduling: jobs beyond MAX_CONCURRENT_JOBS wait in a queue of at most MAX_QUEUED_JOBS
+MAX_CONCURRENT_JOBS = int(os.environ.get('MAX_CONCURRENT_JOBS', 1))
+MAX_QUEUED_JOBS = int(os.environ.get('MAX_QUEUED_JOBS', 10))
+ESTIMATED_ENCODE_SPEED = float(os.environ.get('ESTIMATED_ENCODE_SPEED', 2.0))  # media seconds per second, for queue estimates
+JOB_POLL_INTERVAL = 1  # seconds between queue checks of idle workers
+# Status streams (server-sent events)
+STATUS_STREAM_POLL_INTERVAL = 0.5  # seconds between job database checks per stream
+STATUS_STREAM_KEEPALIVE = 15  # seconds between keep-alive comments
+STATUS_STREAM_MAX_SECONDS = 300  # streams end after this; the browser reconnects with Last-Event-ID
+ZIP_STREAM_CHUNK_SIZE = 1024 * 1024  # bytes read per chunk when streaming ZIP downloads
+UPLOAD_CHUNK_SIZE = int(os.environ.get('UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024))  # chunk size suggested to resumable upload clients
+CAS_FOLDER = os.path.join(UPLOAD_FOLDER, 'cas')  # finalized uploads, stored once per SHA-256
+RESULT_CACHE_FOLDER = os.path.join(OUTPUT_FOLDER, 'cache')  # finished outputs by input hashes and job settings
+RESULT_CACHE_MAX_BYTES = int(os.environ.get('RESULT_CACHE_MAX_MB', 10240)) * 1024 * 1024  # 0 disables the result cache
+# Build the output + tracklist ZIP once when a job completes instead of on every download
+BUNDLE_DOWNLOADS = os.environ.get('BUNDLE_DOWNLOADS', '1') != '0'
+# Let the reverse proxy send download files: '' (gunicorn sends them), 'x-accel' (nginx) or 'x-sendfile'
+DOWNLOAD_OFFLOAD = os.environ.get('DOWNLOAD_OFFLOAD', '')
+DOWNLOAD_ACCEL_PREFIX = os.environ.get('DOWNLOAD_ACCEL_PREFIX', '/protected-output/')  # internal nginx location for OUTPUT_FOLDER
+# Output formats of the audio merge mode: inputs already in the codec and container are joined by stream copy
+AUDIO_MERGE_FORMATS = {
+    'mp3': {'codec': 'mp3', 'format_name': 'mp3', 'mimetype': 'audio/mpeg', 'encode_args': ['-c:a', 'libmp3lame', '-b:a', '192k']},
+    'm4a': {'codec': 'aac', 'format_name': 'mov,mp4,m4a,3gp,3g2,mj2', 'mimetype': 'audio/mp4', 'encode_args': ['-c:a', 'aac', '-b:a', '192k']},
+}
+# Persistent state shared by all gunicorn workers (not touched by cleanup)
+STATE_FOLDER = os.environ.get('STATE_FOLDER', '/tmp/state')
+JOB_DB_PATH = os.path.join(STATE_FOLDER, 'jobs.db')
+# Measured effect and audio speeds of this machine, written by `python app.py --calibrate`
+EFFECT_COSTS_PATH = os.path.join(STATE_FOLDER, 'effect_costs.json')
+CALIBRATION_SECONDS = 4  # length of the synthetic clip rendered per effect
+CALIBRATION_SIZE = (1280, 720)
 
 # Video effects mapping with categories
+# 'stateful': filter output depends on previous frames (zoompan accumulation, tmix),
+# so the timeline cannot be split into independently encoded segments
+# 'period': seconds after which a time-dependent effect repeats exactly (image mode loops it)
 VIDEO_EFFECTS = {
     # No Effect
     'none': {'filter': None, 'category': 'none'},
@@ -39,25 +117,25 @@ VIDEO_EFFECTS = {
     'blur': {'filter': 'gblur=sigma=2:steps=1', 'category': 'static'},
     
     # BEWEGTE EFFEKTE - Zoom & Pan
-    'zoom_in': {'filter': 'zoompan=z=\'min(zoom+0.005,1.5)\':d=250:x=iw/2-(iw/zoom/2):y=ih/2-(ih/zoom/2)', 'category': 'animated'},
-    'zoom_out': {'filter': 'zoompan=z=\'if(lte(zoom,1.0),1.5,max(1.001,zoom-0.005))\':d=1', 'category': 'animated'},
-    'breathing': {'filter': 'zoompan=z=\'1+0.15*sin(2*PI*t)\':d=1:x=iw/2-(iw/zoom/2):y=ih/2-(ih/zoom/2)', 'category': 'animated'},
-    'breathing_slow': {'filter': 'zoompan=z=\'1+0.1*sin(2*PI*t/3)\':d=1:x=iw/2-(iw/zoom/2):y=ih/2-(ih/zoom/2)', 'category': 'animated'},
-    'ken_burns': {'filter': 'zoompan=z=\'min(max(zoom,pzoom)+0.0015,1.5)\':d=1:x=iw/2-(iw/zoom/2):y=ih/2-(ih/zoom/2)', 'category': 'animated'},
-    'pan_right': {'filter': 'zoompan=z=1:x=\'x+5\':y=y:d=1', 'category': 'animated'},
+    'zoom_in': {'filter': 'zoompan=z=\'min(zoom+0.005,1.5)\':d=250:x=iw/2-(iw/zoom/2):y=ih/2-(ih/zoom/2)', 'category': 'animated', 'stateful': True},
+    'zoom_out': {'filter': 'zoompan=z=\'if(lte(zoom,1.0),1.5,max(1.001,zoom-0.005))\':d=1', 'category': 'animated', 'stateful': True},
+    'breathing': {'filter': 'zoompan=z=\'1+0.15*sin(2*PI*it)\':d=1:x=iw/2-(iw/zoom/2):y=ih/2-(ih/zoom/2)', 'category': 'animated', 'period': 1},
+    'breathing_slow': {'filter': 'zoompan=z=\'1+0.1*sin(2*PI*it/3)\':d=1:x=iw/2-(iw/zoom/2):y=ih/2-(ih/zoom/2)', 'category': 'animated', 'period': 3},
+    'ken_burns': {'filter': 'zoompan=z=\'min(max(zoom,pzoom)+0.0015,1.5)\':d=1:x=iw/2-(iw/zoom/2):y=ih/2-(ih/zoom/2)', 'category': 'animated', 'stateful': True},
+    'pan_right': {'filter': 'zoompan=z=1:x=\'x+5\':y=y:d=1', 'category': 'animated', 'stateful': True},
     
     # BEWEGTE EFFEKTE - Rotation
-    'rotate': {'filter': 'rotate=angle=2*PI*t/10:c=black', 'category': 'animated'},
-    'rotate_slow': {'filter': 'rotate=angle=PI*t/20:c=black', 'category': 'animated'},
-    'rotate_fast': {'filter': 'rotate=angle=4*PI*t:c=black', 'category': 'animated'},
+    'rotate': {'filter': 'rotate=angle=2*PI*t/10:c=black', 'category': 'animated', 'period': 10},
+    'rotate_slow': {'filter': 'rotate=angle=PI*t/20:c=black', 'category': 'animated', 'period': 40},
+    'rotate_fast': {'filter': 'rotate=angle=4*PI*t:c=black', 'category': 'animated', 'period': Fraction(1, 2)},
     
     # BEWEGTE EFFEKTE - Farben
-    'psychedelic': {'filter': 'hue=s=1.3:h=360*t*3', 'category': 'animated'},
-    'psychedelic_slow': {'filter': 'hue=s=1.2:h=360*t', 'category': 'animated'},
-    'rainbow': {'filter': 'hue=h=360*t*5:s=1.5', 'category': 'animated'},
-    'color_wave': {'filter': 'hue=h=sin(2*PI*t*2)*180+180:s=1.3', 'category': 'animated'},
-    'saturation_pulse': {'filter': 'hue=s=1+0.7*sin(2*PI*t*3)', 'category': 'animated'},
-    'brightness_pulse': {'filter': 'eq=brightness=0.3*sin(2*PI*t*2)', 'category': 'animated'},
+    'psychedelic': {'filter': 'hue=s=1.3:h=360*t*3', 'category': 'animated', 'period': Fraction(1, 3)},
+    'psychedelic_slow': {'filter': 'hue=s=1.2:h=360*t', 'category': 'animated', 'period': 1},
+    'rainbow': {'filter': 'hue=h=360*t*5:s=1.5', 'category': 'animated', 'period': Fraction(1, 5)},
+    'color_wave': {'filter': 'hue=h=sin(2*PI*t*2)*180+180:s=1.3', 'category': 'animated', 'period': Fraction(1, 2)},
+    'saturation_pulse': {'filter': 'hue=s=1+0.7*sin(2*PI*t*3)', 'category': 'animated', 'period': Fraction(1, 3)},
+    'brightness_pulse': {'filter': 'eq=brightness=0.3*sin(2*PI*t*2)', 'category': 'animated', 'period': Fraction(1, 2)},
     
     # BEWEGTE EFFEKTE - Shake & Distortion
     'shake': {'filter': 'crop=in_w-abs(20*sin(t*20)):in_h-abs(20*sin(t*20))', 'category': 'animated'},
@@ -76,9 +154,9 @@ VIDEO_EFFECTS = {
     'glitch_scan': {'filter': 'rgbashift=rh=30*sin(t*20):bv=30*sin(t*20)', 'category': 'animated'},
     
     # BEWEGTE EFFEKTE - Trails & Special
-    'trails': {'filter': 'tmix=frames=5:weights=1 1 1 1 1', 'category': 'animated'},
-    'trails_long': {'filter': 'tmix=frames=10:weights=1 1 1 1 1 1 1 1 1 1', 'category': 'animated'},
-    'ghosting': {'filter': 'tmix=frames=3:weights=1 2 1', 'category': 'animated'},
+    'trails': {'filter': 'tmix=frames=5:weights=1 1 1 1 1', 'category': 'animated', 'stateful': True},
+    'trails_long': {'filter': 'tmix=frames=10:weights=1 1 1 1 1 1 1 1 1 1', 'category': 'animated', 'stateful': True},
+    'ghosting': {'filter': 'tmix=frames=3:weights=1 2 1', 'category': 'animated', 'stateful': True},
     'stop_motion': {'filter': 'fps=8', 'category': 'animated'},
     'crt_flicker': {'filter': 'eq=brightness=0.1*sin(200*t):contrast=1+0.2*sin(100*t)', 'category': 'animated'},
     
@@ -94,16 +172,29 @@ VIDEO_EFFECTS = {
     'psychedelic_staub': {'filter': 'hue=h=360*t*3:s=1.4,noise=alls=25:allf=t+u', 'category': 'combined'},
     'western_dust': {'filter': 'colorbalance=rs=0.2:bs=-0.15,noise=alls=35:allf=t+u,vignette=PI/4,hue=s=1+0.3*sin(t*2)', 'category': 'combined'},
     'noir_grain': {'filter': 'eq=brightness=-0.1:contrast=1.3,noise=alls=40:allf=t+u', 'category': 'combined'},
-    'vintage_breathing': {'filter': 'colorbalance=rs=0.15:bs=-0.1,zoompan=z=\'1+0.12*sin(2*PI*t*2)\':d=1,noise=alls=25:allf=t+u', 'category': 'combined'},
-    'trippy_trails': {'filter': 'hue=h=360*t*4:s=1.5,tmix=frames=8:weights=1 1 1 1 1 1 1 1', 'category': 'combined'},
+    'vintage_breathing': {'filter': 'colorbalance=rs=0.15:bs=-0.1,zoompan=z=\'1+0.12*sin(2*PI*it*2)\':d=1,noise=alls=25:allf=t+u', 'category': 'combined'},
+    'trippy_trails': {'filter': 'hue=h=360*t*4:s=1.5,tmix=frames=8:weights=1 1 1 1 1 1 1 1', 'category': 'combined', 'stateful': True},
     'storm_chaos': {'filter': 'noise=alls=50:allf=t+u,rgbashift=rh=20*sin(t*10):gh=-20*sin(t*10),crop=in_w-abs(30*sin(t*15)):in_h-abs(30*sin(t*15)),eq=brightness=0.1*sin(t*8)', 'category': 'combined'},
     'acid_trip': {'filter': 'hue=h=360*t*5:s=1.6,format=yuv420p,geq=lum=\'lum(X+10*sin(Y/10*2*PI+t*8),Y+10*cos(X/10*2*PI+t*8))\'', 'category': 'combined'},
-    'nightmare_vision': {'filter': 'eq=brightness=-0.3:contrast=1.5,hue=h=180+90*sin(t*2):s=0.5,noise=alls=35:allf=t+u,tmix=frames=4:weights=1 1 1 1', 'category': 'combined'},
+    'nightmare_vision': {'filter': 'eq=brightness=-0.3:contrast=1.5,hue=h=180+90*sin(t*2):s=0.5,noise=alls=35:allf=t+u,tmix=frames=4:weights=1 1 1 1', 'category': 'combined', 'stateful': True},
 }
 
+app.config['USE_X_SENDFILE'] = DOWNLOAD_OFFLOAD == 'x-sendfile'
+
 # Create folders
 Path(UPLOAD_FOLDER).mkdir(parents=True, exist_ok=True)
 Path(OUTPUT_FOLDER).mkdir(parents=True, exist_ok=True)
+Path(STATE_FOLDER).mkdir(parents=True, exist_ok=True)
+Path(CAS_FOLDER).mkdir(parents=True, exist_ok=True)
+Path(RESULT_CACHE_FOLDER).mkdir(parents=True, exist_ok=True)
+
+# Job worker threads of this process; job_condition wakes them for new jobs
+job_workers = []
+job_condition = threading.Condition()
+db_local = threading.local()
+# Incremental SHA-256 of resumable uploads whose chunks arrived in this process: upload_id -> (offset, hash)
+upload_hashers = {}
+upload_hashers_lock = threading.Lock()
 
 HTML_TEMPLATE = '''
 <!DOCTYPE html>
@@ -328,6 +419,9 @@ HTML_TEMPLATE = '''
                 <button type="button" class="mode-btn" id="audioMergeModeBtn" onclick="switchMode('audio')">
                     🎧 Audios zusammenführen
                 </button>
+                <button type="button" class="mode-btn" id="tracklistModeBtn" onclick="switchMode('tracklist')">
+                    📝 Nur Trackliste
+                </button>
             </div>
             <div class="upload-section" id="audioSectionBox">
                 <div class="upload-box" id="audioBox" onclick="document.getElementById('audioInput').click()">
@@ -350,6 +444,16 @@ HTML_TEMPLATE = '''
                     <div class="file-info" id="audioMergeInfo"></div>
                     <input type="file" id="audioMergeInput" name="audios" accept="audio/*" multiple>
                 </div>
+                <div style="display: flex; align-items: center; gap: 10px; margin-top: 12px;">
+                    <label for="audioFormatSelect" style="margin: 0; font-weight: 500; color: #333;">💾 Ausgabeformat:</label>
+                    <select id="audioFormatSelect" style="padding: 6px; border: 2px solid #667eea; border-radius: 6px;">
+                        <option value="mp3">MP3</option>
+                        <option value="m4a">M4A (AAC)</option>
+                    </select>
+                </div>
+                <div style="margin-top: 8px; font-size: 0.85em; color: #666;">
+                    Dateien, die schon im gewählten Format vorliegen, werden ohne Qualitätsverlust übernommen
+                </div>
             </div>
             
             <div class="upload-section">
@@ -476,6 +580,55 @@ HTML_TEMPLATE = '''
                 <div style="margin-top: 8px; font-size: 0.85em; color: #666;">
                     Entfernt die angegebenen Frames jedes Videos, um Loop-Fehlanpassungen zu beheben (Standard: 7)
                 </div>
+                <div style="display: flex; align-items: center; gap: 10px; margin-top: 12px;">
+                    <label for="seedInput" style="cursor: pointer; margin: 0; font-weight: 500; color: #333;">🎲 Seed (optional):</label>
+                    <input type="number" id="seedInput" min="0" placeholder="zufällig" style="width: 120px;" />
+                </div>
+                <div style="margin-top: 8px; font-size: 0.85em; color: #666;">
+                    Gleicher Seed und gleiche Dateien ergeben dieselbe Clip-Reihenfolge; bereits erstellte Videos kommen sofort aus dem Cache
+                </div>
+            </div>
+            
+            <div id="outputCapContainer" style="margin-top: 15px; padding: 12px; background: #f0f1ff; border-left: 4px solid #667eea; border-radius: 6px;">
+                <div style="display: flex; align-items: center; gap: 10px;">
+                    <label for="maxHeightSelect" style="cursor: pointer; margin: 0; font-weight: 500; color: #333;">📐 Maximale Auflösung:</label>
+                    <select id="maxHeightSelect" style="padding: 4px;">
+                        <option value="">Standard</option>
+                        <option value="720">720p</option>
+                        <option value="1080">1080p</option>
+                        <option value="1440">1440p</option>
+                        <option value="2160">2160p (4K)</option>
+                        <option value="0">Wie Quelle</option>
+                    </select>
+                </div>
+                <div style="display: flex; align-items: center; gap: 10px; margin-top: 12px;">
+                    <label for="maxFpsSelect" style="cursor: pointer; margin: 0; font-weight: 500; color: #333;">🎞️ Maximale Bildrate:</label>
+                    <select id="maxFpsSelect" style="padding: 4px;">
+                        <option value="">Standard</option>
+                        <option value="24">24 fps</option>
+                        <option value="25">25 fps</option>
+                        <option value="30">30 fps</option>
+                        <option value="60">60 fps</option>
+                        <option value="0">Wie Quelle</option>
+                    </select>
+                </div>
+                <div style="margin-top: 8px; font-size: 0.85em; color: #666;">
+                    Größere Quellen werden vor dem Effekt verkleinert, das spart Rechenzeit
+                </div>
+            </div>
+            
+            <div id="tracklistContainer" style="margin-top: 15px; display: none; padding: 12px; background: #f0f1ff; border-left: 4px solid #667eea; border-radius: 6px;">
+                <div style="display: flex; align-items: center; gap: 10px;">
+                    <label for="noiseThresholdInput" style="cursor: pointer; margin: 0; font-weight: 500; color: #333;">🔇 Stille-Schwelle (dB):</label>
+                    <input type="number" id="noiseThresholdInput" value="-30" min="-90" max="0" step="1" style="width: 70px;" />
+                </div>
+                <div style="display: flex; align-items: center; gap: 10px; margin-top: 12px;">
+                    <label for="silenceDurationInput" style="cursor: pointer; margin: 0; font-weight: 500; color: #333;">⏱️ Mindestdauer der Stille (s):</label>
+                    <input type="number" id="silenceDurationInput" value="1" min="0.1" max="60" step="0.1" style="width: 70px;" />
+                </div>
+                <div style="margin-top: 8px; font-size: 0.85em; color: #666;">
+                    Liedwechsel werden an Pausen erkannt, die leiser als die Schwelle und mindestens so lang sind
+                </div>
             </div>
             
             <button class="btn" id="submitBtn" disabled onclick="handleUpload()">Video erstellen</button>
@@ -488,7 +641,7 @@ HTML_TEMPLATE = '''
             <ul>
                 <li><strong>Video-Loops:</strong> Werden automatisch geloopt bis zur Audio-Länge</li>
                 <li>🎲 <strong>Mehrere Videos:</strong> Werden zufällig gemischt für mehr Abwechslung!</li>
-                <li>🎧 <strong>Mehrere Audios:</strong> Werden zu einer einzelnen MP3 zusammengefügt</li>
+                <li>🎧 <strong>Mehrere Audios:</strong> Werden zu einer einzelnen MP3 oder M4A zusammengefügt</li>
                 <li><strong>Standbild:</strong> Ein Bild wird für das gesamte Video verwendet</li>
                 <li>✨ <strong>Effekte:</strong> Können mit Videos und Standbildern kombiniert werden</li>
                 <li>Maximale Dateigröße: 500 MB (Audio/Video), 50 MB (Bild)</li>
@@ -577,12 +730,15 @@ HTML_TEMPLATE = '''
         const videoSectionBox = document.querySelector('[id="videoBox"]').closest('.upload-section');
         let currentMode = 'video';
         const trimFramesContainer = document.getElementById('trimFramesContainer');
+        const tracklistContainer = document.getElementById('tracklistContainer');
+        const outputCapContainer = document.getElementById('outputCapContainer');
         
         function switchMode(mode) {
             currentMode = mode;
             const videoModeBtn = document.getElementById('videoModeBtn');
             const imageModeBtn = document.getElementById('imageModeBtn');
             const audioMergeModeBtn = document.getElementById('audioMergeModeBtn');
+            const tracklistModeBtn = document.getElementById('tracklistModeBtn');
             
             audioSectionBox.style.display = 'none';
             audioMergeSectionBox.style.display = 'none';
@@ -604,7 +760,10 @@ HTML_TEMPLATE = '''
             videoModeBtn.classList.remove('active');
             imageModeBtn.classList.remove('active');
             audioMergeModeBtn.classList.remove('active');
+            tracklistModeBtn.classList.remove('active');
             trimFramesContainer.style.display = 'none';
+            tracklistContainer.style.display = 'none';
+            outputCapContainer.style.display = (mode === 'video' || mode === 'image') ? 'block' : 'none';
             
             if (mode === 'video') {
                 videoModeBtn.classList.add('active');
@@ -617,6 +776,11 @@ HTML_TEMPLATE = '''
                 audioSectionBox.style.display = 'block';
                 imageSectionBox.style.display = 'block';
                 submitBtn.textContent = 'Video erstellen';
+            } else if (mode === 'tracklist') {
+                tracklistModeBtn.classList.add('active');
+                audioSectionBox.style.display = 'block';
+                tracklistContainer.style.display = 'block';
+                submitBtn.textContent = 'Trackliste erstellen';
             } else {
                 audioMergeModeBtn.classList.add('active');
                 audioMergeSectionBox.style.display = 'block';
@@ -648,6 +812,8 @@ HTML_TEMPLATE = '''
                 submitBtn.disabled = !(audioInput.files.length > 0 && videoInput.files.length > 0);
             } else if (currentMode === 'image') {
                 submitBtn.disabled = !(audioInput.files.length > 0 && imageInput.files.length > 0);
+            } else if (currentMode === 'tracklist') {
+                submitBtn.disabled = !(audioInput.files.length > 0);
             } else {
                 submitBtn.disabled = !(audioMergeInput.files.length > 1);
             }
@@ -712,6 +878,8 @@ HTML_TEMPLATE = '''
             
             const formData = new FormData();
             formData.append('mode', currentMode);
+            // Files are sent through resumable uploads first; the job references their IDs
+            const uploadFiles = [];
             
             let uploadDescription = '';
             let selectedEffect = document.getElementById('effectSelect').value;
@@ -721,6 +889,22 @@ HTML_TEMPLATE = '''
             if (currentMode === 'video') {
                 const trimFramesInput = document.getElementById('trimFramesInput');
                 formData.append('trim_frames', trimFramesInput.value);
+                const seedInput = document.getElementById('seedInput');
+                if (seedInput.value !== '') {
+                    formData.append('seed', seedInput.value);
+                }
+            }
+            
+            // Output cap (video and image mode); without a choice the server default applies
+            if (currentMode === 'video' || currentMode === 'image') {
+                const maxHeight = document.getElementById('maxHeightSelect').value;
+                const maxFps = document.getElementById('maxFpsSelect').value;
+                if (maxHeight !== '') {
+                    formData.append('max_height', maxHeight);
+                }
+                if (maxFps !== '') {
+                    formData.append('max_fps', maxFps);
+                }
             }
             
             if (currentMode === 'video') {
@@ -732,14 +916,14 @@ HTML_TEMPLATE = '''
                     showError(`Audio-Datei zu groß: ${formatFileSize(audioInput.files[0].size)} (max 500 MB)`);
                     return;
                 }
-                formData.append('audio', audioInput.files[0]);
+                uploadFiles.push({ field: 'audio_upload', file: audioInput.files[0] });
                 
                 for (let i = 0; i < videoInput.files.length; i++) {
                     if (videoInput.files[i].size > maxSize) {
                         showError(`Video ${i+1} zu groß: ${formatFileSize(videoInput.files[i].size)} (max 500 MB)`);
                         return;
                     }
-                    formData.append('videos', videoInput.files[i]);
+                    uploadFiles.push({ field: 'video_uploads', file: videoInput.files[i] });
                 }
                 
                 uploadDescription = `1 Audio + ${videoInput.files.length} Video${videoInput.files.length > 1 ? 's' : ''}`;
@@ -760,9 +944,22 @@ HTML_TEMPLATE = '''
                     showError(`Bild zu groß: ${formatFileSize(imageInput.files[0].size)} (max 50 MB)`);
                     return;
                 }
-                formData.append('audio', audioInput.files[0]);
-                formData.append('image', imageInput.files[0]);
+                uploadFiles.push({ field: 'audio_upload', file: audioInput.files[0] });
+                uploadFiles.push({ field: 'image_upload', file: imageInput.files[0] });
                 uploadDescription = `1 Audio + 1 Standbild`;
+            } else if (currentMode === 'tracklist') {
+                if (audioInput.files.length === 0) {
+                    showError('Audio-Datei benötigt');
+                    return;
+                }
+                if (audioInput.files[0].size > maxSize) {
+                    showError(`Audio-Datei zu groß: ${formatFileSize(audioInput.files[0].size)} (max 500 MB)`);
+                    return;
+                }
+                uploadFiles.push({ field: 'audio_upload', file: audioInput.files[0] });
+                formData.append('noise_threshold', document.getElementById('noiseThresholdInput').value);
+                formData.append('silence_duration', document.getElementById('silenceDurationInput').value);
+                uploadDescription = '1 Audio → Trackliste';
             } else {
                 if (audioMergeInput.files.length < 2) {
                     showError('Bitte mindestens 2 Audiodateien auswählen');
@@ -773,15 +970,16 @@ HTML_TEMPLATE = '''
                         showError(`Audio ${i+1} zu groß: ${formatFileSize(audioMergeInput.files[i].size)} (max 500 MB)`);
                         return;
                     }
-                    formData.append('audios', audioMergeInput.files[i]);
+                    uploadFiles.push({ field: 'audio_uploads', file: audioMergeInput.files[i] });
                 }
+                formData.append('audio_format', document.getElementById('audioFormatSelect').value);
                 uploadDescription = `${audioMergeInput.files.length} Audios zusammenführen`;
             }
             
             resultDiv.style.display = 'block';
             resultDiv.className = 'result loading';
             
-            const effectText = (currentMode !== 'audio' && selectedEffect !== 'none') ? ` + ${selectedEffect} Effekt` : '';
+            const effectText = (currentMode !== 'audio' && currentMode !== 'tracklist' && selectedEffect !== 'none') ? ` + ${selectedEffect} Effekt` : '';
             
             resultDiv.innerHTML = `
                 <div class="spinner"></div>
@@ -789,11 +987,30 @@ HTML_TEMPLATE = '''
                 <div style="margin-top: 10px;">
                     ${uploadDescription}${effectText}
                 </div>
+                <div id="uploadProgress" style="margin-top: 10px; font-size: 0.9em; color: #666;"></div>
             `;
             
             submitBtn.disabled = true;
             
             try {
+                const totalBytes = uploadFiles.reduce((sum, entry) => sum + entry.file.size, 0);
+                let doneBytes = 0;
+                for (let i = 0; i < uploadFiles.length; i++) {
+                    const entry = uploadFiles[i];
+                    const uploadId = await uploadFileResumable(entry.file, (offset, hashing) => {
+                        const uploadProgress = document.getElementById('uploadProgress');
+                        if (uploadProgress && hashing) {
+                            const percent = entry.file.size ? Math.floor(offset * 100 / entry.file.size) : 100;
+                            uploadProgress.textContent = `Datei ${i + 1}/${uploadFiles.length}: ${entry.file.name} · wird geprüft ${percent}%`;
+                        } else if (uploadProgress) {
+                            const percent = totalBytes ? Math.floor((doneBytes + offset) * 100 / totalBytes) : 100;
+                            uploadProgress.textContent = `Datei ${i + 1}/${uploadFiles.length}: ${entry.file.name} · ${percent}%`;
+                        }
+                    });
+                    doneBytes += entry.file.size;
+                    formData.append(entry.field, uploadId);
+                }
+                
                 const response = await fetch('/upload', {
                     method: 'POST',
                     body: formData
@@ -834,109 +1051,159 @@ HTML_TEMPLATE = '''
                     <div id="progressText" style="margin-top: 5px; font-size: 0.9em; color: #666;">0%</div>
                 `;
                 
-                const pollInterval = setInterval(async () => {
-                    try {
-                        const statusResponse = await fetch(`/status/${jobId}`);
-                        const statusData = await statusResponse.json();
-                        
-                        if (!statusData.success) {
-                            clearInterval(pollInterval);
-                            showError('Fehler beim Abrufen des Status');
-                            submitBtn.disabled = false;
-                            return;
+                // Renders a status update; returns true once the job has finished
+                const handleStatus = (statusData) => {
+                    if (!statusData.success) {
+                        showError('Fehler beim Abrufen des Status');
+                        submitBtn.disabled = false;
+                        return true;
+                    }
+                    
+                    const statusMsg = document.getElementById('statusMessage');
+                    const progressBar = document.getElementById('progressBar');
+                    const progressText = document.getElementById('progressText');
+                    
+                    if (statusMsg) statusMsg.textContent = statusData.message;
+                    if (progressBar) progressBar.style.width = statusData.progress + '%';
+                    if (progressText) {
+                        let progressLabel = statusData.progress + '%';
+                        if (statusData.status === 'processing' && statusData.speed) {
+                            progressLabel += ` · ${statusData.speed}x`;
+                        }
+                        if (statusData.status === 'processing' && statusData.eta_seconds !== undefined) {
+                            const etaMinutes = Math.floor(statusData.eta_seconds / 60);
+                            const etaSeconds = String(statusData.eta_seconds % 60).padStart(2, '0');
+                            progressLabel += ` · noch ~${etaMinutes}:${etaSeconds} Min`;
+                        }
+                        if (statusData.status === 'processing' && statusData.file_progress) {
+                            const running = statusData.file_progress
+                                .map((percent, idx) => ({ percent, idx }))
+                                .filter(file => file.percent < 100)
+                                .slice(0, 4)
+                                .map(file => `Datei ${file.idx + 1}: ${file.percent}%`);
+                            if (running.length) progressLabel += ` · ${running.join(', ')}`;
+                        }
+                        progressText.textContent = progressLabel;
+                    }
+                    
+                    if (statusData.status === 'complete') {
+                        let modeBadge = '';
+                        if (statusData.mode === 'image') {
+                            modeBadge = '<br><span style="color: #667eea;">🖼️ Standbild-Modus</span>';
+                        } else if (statusData.mode === 'audio') {
+                            modeBadge = '<br><span style="color: #667eea;">🎧 Audio-Merge erfolgreich</span>';
+                        } else if (statusData.mode === 'tracklist') {
+                            modeBadge = `<br><span style="color: #667eea;">📝 ${statusData.track_count} Track(s) erkannt</span>`;
+                        } else if (statusData.video_count) {
+                            modeBadge = `<br><span style="color: #667eea;">🎲 ${statusData.video_count} Videos zufällig gemischt (Seed ${statusData.seed})</span>`;
+                        }
+                        if (statusData.cached) {
+                            modeBadge += '<br><span style="color: #28a745;">⚡ Aus dem Cache</span>';
                         }
                         
-                        const statusMsg = document.getElementById('statusMessage');
-                        const progressBar = document.getElementById('progressBar');
-                        const progressText = document.getElementById('progressText');
-                        
-                        if (statusMsg) statusMsg.textContent = statusData.message;
-                        if (progressBar) progressBar.style.width = statusData.progress + '%';
-                        if (progressText) progressText.textContent = statusData.progress + '%';
+                        const effectBadge = (statusData.effect && statusData.effect !== 'none' && statusData.mode !== 'audio' && statusData.mode !== 'tracklist')
+                            ? `<br><span style="color: #764ba2;">✨ Mit ${statusData.effect} Effekt</span>`
+                            : '';
                         
-                        if (statusData.status === 'complete') {
-                            clearInterval(pollInterval);
-                            
-                            let modeBadge = '';
-                            if (statusData.mode === 'image') {
-                                modeBadge = '<br><span style="color: #667eea;">🖼️ Standbild-Modus</span>';
-                            } else if (statusData.mode === 'audio') {
-                                modeBadge = '<br><span style="color: #667eea;">🎧 Audio-Merge erfolgreich</span>';
-                            } else if (statusData.video_count) {
-                                modeBadge = `<br><span style="color: #667eea;">🎲 ${statusData.video_count} Videos zufällig gemischt</span>`;
-                            }
-                            
-                            const effectBadge = (statusData.effect && statusData.effect !== 'none' && statusData.mode !== 'audio')
-                                ? `<br><span style="color: #764ba2;">✨ Mit ${statusData.effect} Effekt</span>`
-                                : '';
-                            
-                            let downloadOptions = '';
-                            if (statusData.has_tracklist) {
-                                if (statusData.mode === 'audio') {
-                                    downloadOptions = `
-                                        <div style="margin-top: 15px; display: grid; grid-template-columns: 1fr 1fr; gap: 10px;">
-                                            <a href="/download/${statusData.file_id}" class="download-btn" download>
-                                                📦 ZIP (Audio + Tracklist)
-                                            </a>
-                                            <a href="/download-audio/${statusData.file_id}" class="download-btn" download style="background: #17a2b8;">
-                                                🎧 Nur MP3
-                                            </a>
-                                        </div>
-                                        <div style="margin-top: 10px;">
-                                            <a href="/download-tracklist/${statusData.file_id}" class="download-btn" download style="width: 100%; background: #6c757d;">
-                                                📝 Nur Trackliste
-                                            </a>
-                                        </div>
-                                    `;
-                                } else {
-                                    downloadOptions = `
-                                        <div style="margin-top: 15px; display: grid; grid-template-columns: 1fr 1fr; gap: 10px;">
-                                            <a href="/download/${statusData.file_id}" class="download-btn" download>
-                                                📦 ZIP (Video + Tracklist)
-                                            </a>
-                                            <a href="/download-video/${statusData.file_id}" class="download-btn" download style="background: #17a2b8;">
-                                                🎬 Nur Video
-                                            </a>
-                                        </div>
-                                        <div style="margin-top: 10px;">
-                                            <a href="/download-tracklist/${statusData.file_id}" class="download-btn" download style="width: 100%; background: #6c757d;">
-                                                📝 Nur Trackliste
-                                            </a>
-                                        </div>
-                                    `;
-                                }
+                        let downloadOptions = '';
+                        if (statusData.mode === 'tracklist') {
+                            downloadOptions = `
+                                <a href="/download-tracklist/${statusData.file_id}" class="download-btn" download>
+                                    📝 Trackliste herunterladen
+                                </a>
+                            `;
+                        } else if (statusData.has_tracklist) {
+                            if (statusData.mode === 'audio') {
+                                downloadOptions = `
+                                    <div style="margin-top: 15px; display: grid; grid-template-columns: 1fr 1fr; gap: 10px;">
+                                        <a href="/download/${statusData.file_id}" class="download-btn" download>
+                                            📦 ZIP (Audio + Tracklist)
+                                        </a>
+                                        <a href="/download-audio/${statusData.file_id}" class="download-btn" download style="background: #17a2b8;">
+                                            🎧 Nur ${(statusData.audio_format || 'mp3').toUpperCase()}
+                                        </a>
+                                    </div>
+                                    <div style="margin-top: 10px;">
+                                        <a href="/download-tracklist/${statusData.file_id}" class="download-btn" download style="width: 100%; background: #6c757d;">
+                                            📝 Nur Trackliste
+                                        </a>
+                                    </div>
+                                `;
                             } else {
-                                const downloadLabel = statusData.mode === 'audio' ? '⬇️ MP3 herunterladen' : '⬇️ Video herunterladen';
                                 downloadOptions = `
-                                    <a href="/download/${statusData.file_id}" class="download-btn" download>
-                                        ${downloadLabel}
-                                    </a>
+                                    <div style="margin-top: 15px; display: grid; grid-template-columns: 1fr 1fr; gap: 10px;">
+                                        <a href="/download/${statusData.file_id}" class="download-btn" download>
+                                            📦 ZIP (Video + Tracklist)
+                                        </a>
+                                        <a href="/download-video/${statusData.file_id}" class="download-btn" download style="background: #17a2b8;">
+                                            🎬 Nur Video
+                                        </a>
+                                    </div>
+                                    <div style="margin-top: 10px;">
+                                        <a href="/download-tracklist/${statusData.file_id}" class="download-btn" download style="width: 100%; background: #6c757d;">
+                                            📝 Nur Trackliste
+                                        </a>
+                                    </div>
                                 `;
                             }
-                            
-                            resultDiv.className = 'result success';
-                            resultDiv.innerHTML = `
-                                <div style="text-align: center;">
-                                    <div style="font-size: 3em; margin-bottom: 10px;">✅</div>
-                                    <div><strong>${statusData.mode === 'audio' ? 'Audios erfolgreich zusammengeführt!' : 'Video erfolgreich erstellt!'}</strong></div>
-                                    <div style="margin: 10px 0;">
-                                        Größe: ${statusData.size}<br>
-                                        Dauer: ${statusData.duration}${modeBadge}${effectBadge}
-                                    </div>
-                                    ${downloadOptions}
-                                </div>
+                        } else {
+                            const downloadLabel = statusData.mode === 'audio' ? `⬇️ ${(statusData.audio_format || 'mp3').toUpperCase()} herunterladen` : '⬇️ Video herunterladen';
+                            downloadOptions = `
+                                <a href="/download/${statusData.file_id}" class="download-btn" download>
+                                    ${downloadLabel}
+                                </a>
                             `;
-                            submitBtn.disabled = false;
-                        } else if (statusData.status === 'error') {
-                            clearInterval(pollInterval);
-                            showError(statusData.message);
-                            submitBtn.disabled = false;
                         }
                         
-                    } catch (error) {
-                        console.error('Status poll error:', error);
+                        resultDiv.className = 'result success';
+                        resultDiv.innerHTML = `
+                            <div style="text-align: center;">
+                                <div style="font-size: 3em; margin-bottom: 10px;">✅</div>
+                                <div><strong>${statusData.mode === 'audio' ? 'Audios erfolgreich zusammengeführt!' : statusData.mode === 'tracklist' ? 'Trackliste erstellt!' : 'Video erfolgreich erstellt!'}</strong></div>
+                                <div style="margin: 10px 0;">
+                                    Größe: ${statusData.size}<br>
+                                    Dauer: ${statusData.duration}${modeBadge}${effectBadge}
+                                </div>
+                                ${downloadOptions}
+                            </div>
+                        `;
+                        submitBtn.disabled = false;
+                        return true;
+                    } else if (statusData.status === 'error') {
+                        showError(statusData.message);
+                        submitBtn.disabled = false;
+                        return true;
                     }
-                }, 5000); // Poll every 5 seconds
+                    return false;
+                };
+                
+                if (window.EventSource) {
+                    // Server-sent events: updates arrive as soon as the job changes;
+                    // after a reconnect the browser resumes with Last-Event-ID
+                    const statusSource = new EventSource(`/status/${jobId}/stream`);
+                    statusSource.addEventListener('status', (event) => {
+                        if (handleStatus(JSON.parse(event.data))) {
+                            statusSource.close();
+                        }
+                    });
+                    statusSource.onerror = () => {
+                        if (statusSource.readyState === EventSource.CLOSED) {
+                            showError('Fehler beim Abrufen des Status');
+                            submitBtn.disabled = false;
+                        }
+                    };
+                } else {
+                    const pollInterval = setInterval(async () => {
+                        try {
+                            const statusResponse = await fetch(`/status/${jobId}`);
+                            if (handleStatus(await statusResponse.json())) {
+                                clearInterval(pollInterval);
+                            }
+                        } catch (error) {
+                            console.error('Status poll error:', error);
+                        }
+                    }, 5000); // Poll every 5 seconds
+                }
                 
             } catch (error) {
                 showError(error.message);
@@ -944,6 +1211,146 @@ HTML_TEMPLATE = '''
             }
         }
         
+        // Chunked upload that resumes from the server's offset after a dropped connection
+        // Incremental SHA-256: crypto.subtle cannot hash in chunks and is missing on plain http
+        function createSha256() {
+            const K = new Uint32Array([
+                0x428a2f98, 0x71374491, 0xb5c0fbcf, 0xe9b5dba5, 0x3956c25b, 0x59f111f1, 0x923f82a4, 0xab1c5ed5,
+                0xd807aa98, 0x12835b01, 0x243185be, 0x550c7dc3, 0x72be5d74, 0x80deb1fe, 0x9bdc06a7, 0xc19bf174,
+                0xe49b69c1, 0xefbe4786, 0x0fc19dc6, 0x240ca1cc, 0x2de92c6f, 0x4a7484aa, 0x5cb0a9dc, 0x76f988da,
+                0x983e5152, 0xa831c66d, 0xb00327c8, 0xbf597fc7, 0xc6e00bf3, 0xd5a79147, 0x06ca6351, 0x14292967,
+                0x27b70a85, 0x2e1b2138, 0x4d2c6dfc, 0x53380d13, 0x650a7354, 0x766a0abb, 0x81c2c92e, 0x92722c85,
+                0xa2bfe8a1, 0xa81a664b, 0xc24b8b70, 0xc76c51a3, 0xd192e819, 0xd6990624, 0xf40e3585, 0x106aa070,
+                0x19a4c116, 0x1e376c08, 0x2748774c, 0x34b0bcb5, 0x391c0cb3, 0x4ed8aa4a, 0x5b9cca4f, 0x682e6ff3,
+                0x748f82ee, 0x78a5636f, 0x84c87814, 0x8cc70208, 0x90befffa, 0xa4506ceb, 0xbef9a3f7, 0xc67178f2
+            ]);
+            const H = new Uint32Array([0x6a09e667, 0xbb67ae85, 0x3c6ef372, 0xa54ff53a, 0x510e527f, 0x9b05688c, 0x1f83d9ab, 0x5be0cd19]);
+            const W = new Uint32Array(64);
+            const block = new Uint8Array(64);
+            let blockLength = 0;
+            let totalLength = 0;
+            
+            function compress(bytes, offset) {
+                for (let t = 0; t < 16; t++) {
+                    const i = offset + t * 4;
+                    W[t] = (bytes[i] << 24) | (bytes[i + 1] << 16) | (bytes[i + 2] << 8) | bytes[i + 3];
+                }
+                for (let t = 16; t < 64; t++) {
+                    const w15 = W[t - 15];
+                    const w2 = W[t - 2];
+                    const s0 = ((w15 >>> 7) | (w15 << 25)) ^ ((w15 >>> 18) | (w15 << 14)) ^ (w15 >>> 3);
+                    const s1 = ((w2 >>> 17) | (w2 << 15)) ^ ((w2 >>> 19) | (w2 << 13)) ^ (w2 >>> 10);
+                    W[t] = W[t - 16] + s0 + W[t - 7] + s1;
+                }
+                let a = H[0], b = H[1], c = H[2], d = H[3], e = H[4], f = H[5], g = H[6], h = H[7];
+                for (let t = 0; t < 64; t++) {
+                    const S1 = ((e >>> 6) | (e << 26)) ^ ((e >>> 11) | (e << 21)) ^ ((e >>> 25) | (e << 7));
+                    const temp1 = (h + S1 + ((e & f) ^ (~e & g)) + K[t] + W[t]) | 0;
+                    const S0 = ((a >>> 2) | (a << 30)) ^ ((a >>> 13) | (a << 19)) ^ ((a >>> 22) | (a << 10));
+                    const temp2 = (S0 + ((a & b) ^ (a & c) ^ (b & c))) | 0;
+                    h = g; g = f; f = e; e = (d + temp1) | 0;
+                    d = c; c = b; b = a; a = (temp1 + temp2) | 0;
+                }
+                H[0] += a; H[1] += b; H[2] += c; H[3] += d;
+                H[4] += e; H[5] += f; H[6] += g; H[7] += h;
+            }
+            
+            function update(bytes) {
+                totalLength += bytes.length;
+                let i = 0;
+                if (blockLength > 0) {
+                    i = Math.min(64 - blockLength, bytes.length);
+                    block.set(bytes.subarray(0, i), blockLength);
+                    blockLength += i;
+                    if (blockLength < 64) {
+                        return;
+                    }
+                    compress(block, 0);
+                    blockLength = 0;
+                }
+                for (; i + 64 <= bytes.length; i += 64) {
+                    compress(bytes, i);
+                }
+                block.set(bytes.subarray(i), 0);
+                blockLength = bytes.length - i;
+            }
+            
+            function hexDigest() {
+                const padding = new Uint8Array((blockLength < 56 ? 64 : 128) - blockLength);
+                const view = new DataView(padding.buffer);
+                padding[0] = 0x80;
+                view.setUint32(padding.length - 8, Math.floor(totalLength / 0x20000000));
+                view.setUint32(padding.length - 4, (totalLength * 8) >>> 0);
+                update(padding);
+                return Array.from(H, (word) => word.toString(16).padStart(8, '0')).join('');
+            }
+            
+            return { update, hexDigest };
+        }
+        
+        async function hashFile(file, chunkSize, onProgress) {
+            const hash = createSha256();
+            for (let offset = 0; offset < file.size; offset += chunkSize) {
+                hash.update(new Uint8Array(await file.slice(offset, offset + chunkSize).arrayBuffer()));
+                onProgress(Math.min(offset + chunkSize, file.size));
+            }
+            return hash.hexDigest();
+        }
+        
+        async function uploadFileResumable(file, onProgress) {
+            // The server skips the transfer if it already stores a file with this hash
+            const sha256 = await hashFile(file, 8 * 1024 * 1024, (hashed) => onProgress(hashed, true));
+            const createResponse = await fetch('/uploads', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ filename: file.name, size: file.size, sha256: sha256 })
+            });
+            const session = await createResponse.json();
+            if (!session.success) {
+                throw new Error(session.error || 'Upload fehlgeschlagen');
+            }
+            
+            let offset = session.offset;
+            let retries = 0;
+            while (offset < file.size) {
+                try {
+                    const chunk = file.slice(offset, offset + session.chunk_size);
+                    const response = await fetch(`/uploads/${session.upload_id}?offset=${offset}`, {
+                        method: 'PUT',
+                        body: chunk
+                    });
+                    const result = await response.json();
+                    if (!result.success && response.status !== 409) {
+                        throw new Error(result.error || 'Upload fehlgeschlagen');
+                    }
+                    // On 409 the server reports the offset it actually has
+                    offset = result.offset;
+                    retries = 0;
+                    onProgress(offset);
+                } catch (error) {
+                    if (++retries > 5) {
+                        throw error;
+                    }
+                    await new Promise((resolve) => setTimeout(resolve, 1000 * retries));
+                    try {
+                        const status = await (await fetch(`/uploads/${session.upload_id}`)).json();
+                        if (status.success) {
+                            offset = status.offset;
+                        }
+                    } catch (statusError) {
+                        console.error('Upload status error:', statusError);
+                    }
+                }
+            }
+            
+            const finalizeResponse = await fetch(`/uploads/${session.upload_id}/finalize`, { method: 'POST' });
+            const finalized = await finalizeResponse.json();
+            if (!finalized.success) {
+                throw new Error(finalized.error || 'Upload fehlgeschlagen');
+            }
+            return session.upload_id;
+        }
+        
         function showError(message) {
             resultDiv.style.display = 'block';
             resultDiv.className = 'result error';
@@ -960,159 +1367,982 @@ HTML_TEMPLATE = '''
 </html>
 '''
 
-def get_video_duration(file_path):
-    """Get video duration using ffprobe"""
+def run_ffmpeg(cmd, timeout, on_progress=None, on_stderr=None):
+    """
+    Run an ffmpeg command with machine-readable progress on a pipe.
+    
+    stderr is drained by a thread and only its last lines are kept, so long encodes
+    do not buffer their whole log in memory. Callback errors are logged and do not
+    stop the pipes from being read (ffmpeg would block on a full pipe).
+    
+    Args:
+        cmd: ffmpeg command list (starting with 'ffmpeg')
+        timeout: Timeout in seconds
+        on_progress: Optional callable receiving a dict with frame, out_time (seconds),
+            fps, speed and done for every progress report
+        on_stderr: Optional callable receiving every stderr line (e.g. filter logs)
+    
+    Returns:
+        subprocess.CompletedProcess with the stderr tail
+    
+    Raises:
+        subprocess.TimeoutExpired if the command runs longer than timeout
+    """
+    cmd = [cmd[0], '-nostats', '-progress', 'pipe:1', *cmd[1:]]
+    process = subprocess.Popen(
+        cmd,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        errors='replace'
+    )
+    stderr_tail = deque(maxlen=FFMPEG_STDERR_TAIL_LINES)
+    
+    def drain_stderr():
+        for line in process.stderr:
+            stderr_tail.append(line)
+            if on_stderr:
+                try:
+                    on_stderr(line)
+                except Exception as e:
+                    print(f"FFmpeg stderr callback error: {e}")
+    
+    stderr_thread = threading.Thread(target=drain_stderr, daemon=True)
+    stderr_thread.start()
+    timed_out = threading.Event()
+    
+    def kill():
+        timed_out.set()
+        process.kill()
+    
+    timer = threading.Timer(timeout, kill)
+    timer.start()
     try:
-        result = subprocess.run([
-            'ffprobe', '-v', 'error',
-            '-show_entries', 'format=duration',
-            '-of', 'default=noprint_wrappers=1:nokey=1',
-            file_path
-        ], capture_output=True, text=True, timeout=30)
-        return float(result.stdout.strip())
-    except Exception as e:
-        print(f"Error getting duration: {e}")
-        return 0
+        report = {}
+        for line in process.stdout:
+            key, _, value = line.strip().partition('=')
+            report[key] = value
+            if key == 'progress':
+                if on_progress:
+                    try:
+                        on_progress(parse_ffmpeg_progress(report))
+                    except Exception as e:
+                        # e.g. "database is locked" in update_status; progress is best effort
+                        print(f"FFmpeg progress callback error: {e}")
+                report = {}
+        process.wait()
+    except BaseException:
+        # Without a reader on stdout ffmpeg would never exit and the join below would hang
+        process.kill()
+        process.wait()
+        raise
+    finally:
+        timer.cancel()
+        stderr_thread.join()
+    
+    if timed_out.is_set():
+        raise subprocess.TimeoutExpired(cmd, timeout)
+    return subprocess.CompletedProcess(cmd, process.returncode, '', ''.join(stderr_tail))
 
-def format_duration(seconds):
-    """Format seconds to readable time"""
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    secs = int(seconds % 60)
+def parse_ffmpeg_progress(report):
+    """Convert a -progress key=value block into frame, out_time (seconds), fps, speed and done"""
+    def number(value):
+        try:
+            return float(value.rstrip('x'))
+        except (AttributeError, ValueError):
+            return None
+    out_time_us = number(report.get('out_time_us'))
+    return {
+        'frame': int(number(report.get('frame')) or 0),
+        'out_time': max(0.0, out_time_us / 1000000) if out_time_us is not None else 0.0,
+        'fps': number(report.get('fps')),
+        'speed': number(report.get('speed')),
+        'done': report.get('progress') == 'end',
+    }
+
+def progress_details(out_time, fps, speed, total_seconds):
+    """Status fields for a running encode: out_time, encode_fps, speed and eta_seconds"""
+    details = {'out_time': round(out_time, 1)}
+    if fps:
+        details['encode_fps'] = round(fps, 1)
+    if speed:
+        details['speed'] = round(speed, 2)
+        if total_seconds:
+            details['eta_seconds'] = int(max(0, total_seconds - out_time) / speed)
+    return details
+
+def status_progress(job_id, progress_from, progress_to, message, total_seconds, data=None):
+    """
+    Build an on_progress callback for run_ffmpeg that maps the encoded time onto a
+    range of the status progress.
     
-    if hours > 0:
-        return f"{hours}h {minutes}min {secs}s"
-    elif minutes > 0:
-        return f"{minutes}min {secs}s"
-    else:
-        return f"{secs}s"
+    Returns:
+        Callable, or None without a status file
+    """
+    if not job_id:
+        return None
+    last_update = [0.0]
+    
+    def on_progress(info):
+        now = time.time()
+        if now - last_update[0] < PROGRESS_UPDATE_INTERVAL and not info['done']:
+            return
+        last_update[0] = now
+        fraction = min(1.0, info['out_time'] / total_seconds) if total_seconds else 0.0
+        progress = progress_from + int((progress_to - progress_from) * fraction)
+        status_data = dict(data or {})
+        status_data.update(progress_details(info['out_time'], info['fps'], info['speed'], total_seconds))
+        update_status(job_id, 'processing', progress, message, status_data)
+    
+    return on_progress
 
-def format_size(bytes):
-    """Format bytes to readable size"""
-    for unit in ['B', 'KB', 'MB', 'GB']:
-        if bytes < 1024.0:
-            return f"{bytes:.2f} {unit}"
-        bytes /= 1024.0
-    return f"{bytes:.2f} TB"
+def x264_encode_args():
+    """H.264 encoding parameters shared by all video encodes"""
+    return [
+        '-c:v', 'libx264',
+        '-preset', 'fast',
+        '-crf', '28',
+        '-profile:v', 'high',
+        '-level', '4.2',
+        '-pix_fmt', 'yuv420p',
+        '-maxrate', '10M',
+        '-bufsize', '20M',
+        '-g', '250',
+    ]
 
-def seconds_to_hhmmss(seconds):
-    """Konvertiert Sekunden zu HH:MM:SS Format"""
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    secs = int(seconds % 60)
+def loop_clip_encode_args():
+    """
+    H.264 parameters for a clip that is looped by stream copy: no B-frames, so packets
+    stay in presentation order and the looped copy can be cut at the audio end.
+    """
+    return [*x264_encode_args(), '-bf', '0']
+
+def still_image_encode_args(gop_frames):
+    """H.264 parameters for a looped still image: stillimage tuning and one keyframe per clip"""
+    args = loop_clip_encode_args()
+    args[args.index('-g') + 1] = str(gop_frames)
+    return [*args, '-tune', 'stillimage']
+
+def mux_audio_args(audio_path):
+    """
+    Audio parameters for the final MP4 mux.
     
-    return f"{hours:02d}:{minutes:02d}:{secs:02d}"
+    AAC and MP3 audio fits into MP4 as it is and is stream-copied; other codecs are
+    encoded to AAC at AUDIO_BITRATE.
+    """
+    info = probe_media(audio_path) or {}
+    if info.get('audio_codec') in MP4_COPY_AUDIO_CODECS:
+        print(f"Audio is {info['audio_codec']}, copying it into the MP4")
+        return ['-c:a', 'copy']
+    return [
+        '-c:a', 'aac',
+        '-b:a', AUDIO_BITRATE,
+        '-ar', '44100',
+    ]
 
-def trim_video_frames(input_path, output_path, frames_to_trim=7):
+def parse_frame_rate(rate, default=25):
+    """Parse an ffprobe frame rate ("30/1", "30000/1001", "29.97") into a Fraction"""
+    try:
+        fps = Fraction(rate)
+        return fps if fps > 0 else Fraction(default)
+    except (TypeError, ValueError, ZeroDivisionError):
+        return Fraction(default)
+
+@lru_cache(maxsize=PROBE_CACHE_SIZE)
+def _probe_media_cached(file_path, size, mtime_ns, inode):
+    """Run a single JSON ffprobe call (cached by path, size, mtime and inode)"""
+    result = subprocess.run([
+        'ffprobe', '-v', 'error',
+        '-show_entries',
+        'format=duration,format_name:stream=codec_type,codec_name,profile,pix_fmt,width,height,'
+        'r_frame_rate,nb_frames,sample_rate,channels,channel_layout,bit_rate',
+        '-of', 'json',
+        file_path
+    ], capture_output=True, text=True, timeout=30)
+    if result.returncode != 0:
+        raise Exception(f"ffprobe error: {result.stderr[-200:]}")
+    data = json.loads(result.stdout)
+    streams = data.get('streams', [])
+    video = next((st for st in streams if st.get('codec_type') == 'video'), {})
+    audio = next((st for st in streams if st.get('codec_type') == 'audio'), {})
+    
+    try:
+        duration = float(data.get('format', {}).get('duration', 0))
+    except (TypeError, ValueError):
+        duration = 0.0
+    try:
+        nb_frames = int(video['nb_frames'])
+    except (KeyError, TypeError, ValueError):
+        nb_frames = None
+    
+    return {
+        'duration': duration,
+        'format_name': data.get('format', {}).get('format_name'),
+        'video_codec': video.get('codec_name'),
+        'profile': video.get('profile'),
+        'pix_fmt': video.get('pix_fmt'),
+        'width': video.get('width'),
+        'height': video.get('height'),
+        'r_frame_rate': video.get('r_frame_rate'),
+        'fps': float(parse_frame_rate(video.get('r_frame_rate'))) if video else None,
+        'nb_frames': nb_frames,
+        'audio_codec': audio.get('codec_name'),
+        'sample_rate': int(audio['sample_rate']) if audio.get('sample_rate') else None,
+        'channels': audio.get('channels'),
+        'channel_layout': audio.get('channel_layout'),
+        'audio_bit_rate': int(audio['bit_rate']) if audio.get('bit_rate') else None,
+    }
+
+def probe_media(file_path):
     """
-    Trim N frames from the end of a video file.
+    Get duration, frame rate, codecs, resolution and pix_fmt of a media file.
     
-    Args:
-        input_path: Path to the input video file
-        output_path: Path to save the trimmed video file
-        frames_to_trim: Number of frames to trim from the end (default: 7)
+    Results are cached per file content (path, size, mtime, inode), so each file is
+    probed at most once; a file rewritten in place (e.g. after trimming) is probed again.
     
     Returns:
-        True if successful, raises exception otherwise
+        Dict with media information, or None if the file cannot be probed
     """
     try:
-        # Get video framerate using ffprobe
-        cmd_fps = [
-            'ffprobe', '-v', 'error',
-            '-select_streams', 'v:0',
-            '-show_entries', 'stream=r_frame_rate',
-            '-of', 'default=noprint_wrappers=1:nokey=1',
-            input_path
-        ]
-        result_fps = subprocess.run(cmd_fps, capture_output=True, text=True, timeout=30)
-        fps_str = result_fps.stdout.strip()
-        
-        # Parse framerate (format: "30/1" or "29.97")
-        if '/' in fps_str:
-            num, denom = map(float, fps_str.split('/'))
-            fps = num / denom
-        else:
-            fps = float(fps_str)
-        
-        print(f"Video FPS: {fps}")
-        
-        # Get original duration
-        original_duration = get_video_duration(input_path)
-        print(f"Original duration: {original_duration} seconds")
-        
-        # Calculate duration to trim
-        trim_seconds = frames_to_trim / fps
-        new_duration = original_duration - trim_seconds
-        
-        print(f"Trimming {frames_to_trim} frames (~{trim_seconds:.3f} seconds) from end")
-        print(f"New duration: {new_duration} seconds")
-        
-        if new_duration <= 0:
-            raise Exception(f"Video too short to trim {frames_to_trim} frames")
-        
-        # Use FFmpeg to trim the video (stream copy for speed)
-        cmd_trim = [
-            'ffmpeg', '-y',
-            '-i', input_path,
-            '-t', str(new_duration),
-            '-c:v', 'copy',
-            '-c:a', 'copy',
-            output_path
-        ]
-        
-        print(f"Running trim: {' '.join(cmd_trim[:8])}...")
-        result = subprocess.run(cmd_trim, capture_output=True, text=True, timeout=600)
-        
-        if result.returncode != 0:
-            print(f"FFmpeg trim stderr: {result.stderr[-500:]}")
-            raise Exception(f"FFmpeg trim error: {result.stderr[-200:]}")
-        
-        print(f"Video trimmed successfully: {format_size(os.path.getsize(output_path))}")
-        return True
-        
+        st = os.stat(file_path)
+        return dict(_probe_media_cached(file_path, st.st_size, st.st_mtime_ns, st.st_ino))
     except Exception as e:
-        print(f"Error trimming video: {e}")
-        raise
+        print(f"Error probing {file_path}: {e}")
+        return None
+
+def get_video_duration(file_path):
+    """Get media duration in seconds"""
+    info = probe_media(file_path)
+    return info['duration'] if info else 0
+
+@lru_cache(maxsize=PROBE_CACHE_SIZE)
+def _probe_frame_times_cached(file_path, size, mtime_ns, inode):
+    """Read pts/dts of all video packets in decode order (cached like probe_media)"""
+    result = subprocess.run([
+        'ffprobe', '-v', 'error',
+        '-select_streams', 'v:0',
+        '-show_entries', 'stream=time_base:packet=pts,dts',
+        '-of', 'json',
+        file_path
+    ], capture_output=True, text=True, timeout=300)
+    if result.returncode != 0:
+        raise Exception(f"ffprobe error: {result.stderr[-200:]}")
+    data = json.loads(result.stdout)
+    time_base = Fraction(data['streams'][0]['time_base'])
+    packets = []
+    for pkt in data.get('packets', []):
+        if 'pts' not in pkt:
+            continue
+        pts = pkt['pts'] * time_base
+        dts = pkt['dts'] * time_base if 'dts' in pkt else pts
+        packets.append((pts, dts))
+    return tuple(packets)
 
-def create_tracklist(audio_path, file_id, noise_threshold=-30, silence_duration=1):
+def clip_timing(video_path, frames_to_trim=0):
     """
-    Erstellt eine Trackliste basierend auf erkannten Liedwechseln
-    Format: MM:SS - Song Name
+    Compute concat list directives for a clip, optionally dropping its last frames.
+    
+    The concat demuxer cuts at the decoding timestamp of the outpoint, so two cut
+    points are returned:
+    - 'outpoint' (exact pts of the first dropped frame) for re-encodes, which remove
+      the frames decoded past it with select=concatdec_select
+    - 'copy_outpoint'/'copy_duration' for stream copy: the dts of the first packet in
+      decode order that belongs to a dropped frame, and the display duration of the
+      packets before it
+    
+    A stream-copy cut also loses the B-frames decoded after that packet; 'copy_frames'
+    is the number of frames it actually keeps (equal to 'frames' when the cut is exact).
+    
+    Returns:
+        Dict with frames, frame_pts, duration, outpoint, copy_outpoint, copy_duration, copy_frames
+    """
+    st = os.stat(video_path)
+    packets = _probe_frame_times_cached(video_path, st.st_size, st.st_mtime_ns, st.st_ino)
+    if not packets:
+        raise Exception("No video packets found")
+    frame_pts = sorted(pts for pts, _ in packets)
+    frames = len(frame_pts) - frames_to_trim
+    if frames <= 0:
+        raise Exception(f"Video too short to trim {frames_to_trim} frames")
+    
+    timing = {
+        'frames': frames,
+        'frame_pts': frame_pts,
+        'outpoint': None,
+        'copy_outpoint': None,
+        'copy_duration': None,
+        'copy_frames': frames,
+    }
+    if frames_to_trim > 0:
+        cut_pts = frame_pts[frames]
+        cut_index = next(i for i, (pts, _) in enumerate(packets) if pts >= cut_pts)
+        timing['outpoint'] = cut_pts
+        timing['copy_outpoint'] = packets[cut_index][1]
+        copy_end = min(pts for pts, _ in packets[cut_index:])
+        timing['copy_duration'] = copy_end - frame_pts[0]
+        timing['copy_frames'] = sum(1 for pts in frame_pts if pts < copy_end)
+        timing['duration'] = float(cut_pts - frame_pts[0])
+    else:
+        frame_duration = (frame_pts[-1] - frame_pts[0]) / (len(frame_pts) - 1) if len(frame_pts) > 1 else 0
+        timing['duration'] = float(frame_pts[-1] + frame_duration - frame_pts[0])
+    return timing
+
+def format_concat_time(seconds):
+    """
+    Format a timestamp for a concat list directive.
+    
+    The demuxer works in microseconds; rounding down keeps a frame that starts exactly
+    at an outpoint on the excluded side.
+    """
+    micros = int(Fraction(seconds) * 1000000 // 1)
+    sign = '-' if micros < 0 else ''
+    micros = abs(micros)
+    return f"{sign}{micros // 1000000}.{micros % 1000000:06d}"
+
+def write_concat_list(list_path, entries):
+    """
+    Write an ffmpeg concat demuxer list.
     
     Args:
-        audio_path: Pfad zur Audio-Datei
-        file_id: Eindeutige ID für die Datei
-        noise_threshold: Dezibel-Schwelle für Stille
-        silence_duration: Mindestdauer der Stille
+        list_path: Path of the list file
+        entries: Iterable of (path, inpoint, outpoint, duration); None values are omitted
+    """
+    with open(list_path, 'w') as f:
+        for path, inpoint, outpoint, entry_duration in entries:
+            path_escaped = path.replace("'", "'\\''")
+            f.write(f"file '{path_escaped}'\n")
+            if inpoint is not None:
+                f.write(f"inpoint {format_concat_time(inpoint)}\n")
+            if outpoint is not None:
+                f.write(f"outpoint {format_concat_time(outpoint)}\n")
+            if entry_duration is not None:
+                f.write(f"duration {format_concat_time(entry_duration)}\n")
+
+def build_video_filter(effect, pre_filters=None, time_offset=None, post_filters=None):
+    """
+    Build the -vf filter chain: pre-filters, the effect filter, then post-filters.
+    
+    With time_offset, timestamps are reset and shifted before the effect so that
+    time-dependent filters see the timeline time t, then reset to start at zero.
     
     Returns:
-        Pfad zur erstellten TXT-Datei
+        Filter chain string, or None if no filtering is needed
     """
-    try:
-        print(f"[Tracklist] Creating tracklist for {file_id}")
-        
-        # FFmpeg Befehl zum Erkennen von Stille
-        cmd = [
-            'ffmpeg', '-i', audio_path,
-            '-af', f'silencedetect=noise={noise_threshold}dB:d={silence_duration}',
-            '-f', 'null', '-'
-        ]
-        
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=300
-        )
-        
-        # Parse silence detections
-        stderr_output = result.stderr
-        silence_starts = re.findall(r'silence_start: ([\d.]+)', stderr_output)
-        silence_ends = re.findall(r'silence_end: ([\d.]+)', stderr_output)
-        
-        # Get audio duration
-        audio_duration = get_video_duration(audio_path)
+    filters = list(pre_filters or [])
+    effect_filter = VIDEO_EFFECTS.get(effect, {}).get('filter')
+    if time_offset is not None:
+        filters.append(f"setpts=PTS-STARTPTS+{float(time_offset)}/TB")
+        if effect_filter:
+            filters.append(effect_filter)
+        filters.append("setpts=PTS-STARTPTS")
+    elif effect_filter:
+        filters.append(effect_filter)
+    filters.extend(post_filters or [])
+    return ','.join(filters) if filters else None
+
+def delivery_size(width, height, max_height):
+    """
+    Frame size under the output cap: the short side is limited to max_height and the long
+    side to the matching 16:9 width. Sources are never upscaled.
+    
+    Returns:
+        (width, height), or None if the source already fits
+    """
+    if not max_height or not width or not height:
+        return None
+    factor = min(Fraction(max_height * 16 // 9, max(width, height)), Fraction(max_height, min(width, height)))
+    if factor >= 1:
+        return None
+    return max(2, int(width * factor) // 2 * 2), max(2, int(height * factor) // 2 * 2)
+
+def delivery_filters(source_paths, max_height, max_fps=None):
+    """
+    Pre-filters that bring the sources down to the output cap before the effect chain.
+    
+    The scale size is computed from the input size when the filter graph is configured
+    (ffmpeg configures it again when concatenated clips change size), not per frame.
+    Only sources above the cap are filtered; without any, the list is empty and stream
+    copy stays possible.
+    
+    Args:
+        source_paths: Input files
+        max_height: Height of the 16:9 output box (0 or None: no limit)
+        max_fps: Frame rate limit (0 or None: no limit)
+    
+    Returns:
+        List of filter strings
+    """
+    infos = [probe_media(path) or {} for path in source_paths]
+    filters = []
+    if any(delivery_size(info.get('width'), info.get('height'), max_height) for info in infos):
+        max_width = max_height * 16 // 9
+        filters.append(
+            f"scale=w='if(gte(iw,ih),min(iw,{max_width}),min(iw,{max_height}))'"
+            f":h='if(gte(iw,ih),min(ih,{max_height}),min(ih,{max_width}))'"
+            ":force_original_aspect_ratio=decrease:force_divisible_by=2"
+        )
+    if max_fps and any((info.get('fps') or 0) > max_fps for info in infos):
+        filters.append(f"fps={max_fps}")
+    if filters:
+        print(f"Output cap {max_height or 'source'}p / {max_fps or 'source'} fps: {', '.join(filters)}")
+    return filters
+
+def can_concat_copy(video_paths):
+    """
+    Check whether the clips can be joined by the concat demuxer with -c:v copy.
+    
+    All clips must be H.264 yuv420p with identical profile, resolution and frame rate,
+    otherwise the joined stream would not decode consistently.
+    """
+    reference = None
+    for vp in video_paths:
+        info = probe_media(vp)
+        if not info:
+            return False
+        if info['video_codec'] != 'h264' or info['pix_fmt'] != 'yuv420p':
+            print(f"Concat copy not possible: {os.path.basename(vp)} is {info['video_codec']}/{info['pix_fmt']}")
+            return False
+        params = (info['profile'], info['width'], info['height'], info['r_frame_rate'])
+        if reference is None:
+            reference = params
+        elif params != reference:
+            print(f"Concat copy not possible: {os.path.basename(vp)} has {params}, expected {reference}")
+            return False
+    return reference is not None
+
+def clips_share_geometry(video_paths):
+    """Check whether all clips have the same resolution and frame rate"""
+    reference = None
+    for vp in video_paths:
+        info = probe_media(vp)
+        if not info:
+            return False
+        params = (info['width'], info['height'], info['r_frame_rate'])
+        if reference is None:
+            reference = params
+        elif params != reference:
+            print(f"Clips differ in geometry: {os.path.basename(vp)} has {params}, expected {reference}")
+            return False
+    return reference is not None
+
+def prerender_static_effect(video_paths, indices, effect, output_path, frame_limits=None, pre_filters=None):
+    """
+    Render each selected clip once with a static effect applied ('none' only re-encodes,
+    e.g. to trim frame-exactly where a stream-copy cut would drop B-frames).
+    
+    Static effects do not depend on the timeline time t, so the rendered clips can be
+    repeated in the random sequence and joined by stream copy.
+    
+    Args:
+        video_paths: List of source video paths
+        indices: Indices of the clips that are used in the sequence
+        effect: Key of a 'static' entry in VIDEO_EFFECTS
+        output_path: Final output path (used to name the temporary clips)
+        frame_limits: Optional dict mapping clip index to the number of frames to keep
+        pre_filters: Optional filters applied before the effect
+    
+    Returns:
+        Dict mapping clip index to the path of the rendered clip
+    """
+    rendered = {}
+    try:
+        for idx in indices:
+            rendered_path = os.path.join(UPLOAD_FOLDER, f"prerender_{idx}_{os.path.basename(output_path)}")
+            cmd_render = [
+                'ffmpeg', '-y',
+                '-i', video_paths[idx]
+            ]
+            render_filter = build_video_filter(effect, pre_filters)
+            if render_filter:
+                cmd_render.extend(['-vf', render_filter])
+            if frame_limits and frame_limits.get(idx):
+                cmd_render.extend(['-frames:v', str(frame_limits[idx])])
+            cmd_render.extend([
+                *x264_encode_args(),
+                '-an',
+                '-threads', '0',
+                rendered_path
+            ])
+            rendered[idx] = rendered_path
+            print(f"Pre-rendering clip {idx+1}" + (f" with {effect} effect..." if effect != 'none' else " (frame-exact trim)..."))
+            result = run_ffmpeg(cmd_render, timeout=1800)
+            if result.returncode != 0:
+                print(f"FFmpeg pre-render stderr: {result.stderr[-500:]}")
+                raise Exception(f"FFmpeg pre-render error: {result.stderr[-200:]}")
+        return rendered
+    except Exception:
+        for path in rendered.values():
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+
+def use_segmented_encode(effect, duration):
+    """Check whether a re-encode should be split into parallel segments"""
+    if SEGMENT_ENCODE_WORKERS < 2 or duration < SEGMENTED_ENCODE_MIN_DURATION:
+        return False
+    return not VIDEO_EFFECTS.get(effect, {}).get('stateful', False)
+
+def effect_loop_window(effect, fps):
+    """
+    Length of the clip a periodic effect is rendered for before it is looped.
+    
+    The clip is the least common multiple of the effect period and the frame duration,
+    repeated until it is at least EFFECT_LOOP_MIN_SECONDS long.
+    
+    Returns:
+        Window length in seconds as a Fraction, or None if the effect is not periodic
+    """
+    period = VIDEO_EFFECTS.get(effect, {}).get('period')
+    if period is None:
+        return None
+    period = Fraction(period)
+    frame = 1 / Fraction(fps)
+    window = Fraction(math.lcm(period.numerator, frame.numerator), math.gcd(period.denominator, frame.denominator))
+    return window * math.ceil(EFFECT_LOOP_MIN_SECONDS / window)
+
+def segment_bounds(duration, fps):
+    """
+    Split a timeline into frame-aligned segments.
+    
+    The split only depends on duration, fps and SEGMENT_DURATION, so every run
+    produces the same boundaries. Every segment starts with a keyframe because it
+    is encoded independently.
+    
+    Returns:
+        List of (start_seconds, first_frame, frame_count) tuples
+    """
+    fps = Fraction(fps).limit_denominator(1001)
+    total_frames = int(-(-Fraction(duration) * fps // 1))  # ceil
+    frames_per_segment = max(1, round(SEGMENT_DURATION * fps))
+    bounds = []
+    for first_frame in range(0, total_frames, frames_per_segment):
+        frame_count = min(frames_per_segment, total_frames - first_frame)
+        bounds.append((first_frame / fps, first_frame, frame_count))
+    return bounds
+
+def segment_concat_entries(clip_sequence, clip_paths, timings, first_frame, frame_count):
+    """
+    Build the concat list entries covering frames [first_frame, first_frame + frame_count)
+    of a clip sequence, using inpoint/outpoint so no frames outside the segment are read.
+    """
+    entries = []
+    clip_start = 0
+    last_frame = first_frame + frame_count
+    for video_idx in clip_sequence:
+        timing = timings[video_idx]
+        clip_end = clip_start + timing['frames']
+        if clip_end > first_frame and clip_start < last_frame:
+            local_first = max(0, first_frame - clip_start)
+            local_last = min(timing['frames'], last_frame - clip_start)
+            frame_pts = timing['frame_pts']
+            inpoint = frame_pts[local_first] if local_first > 0 else None
+            outpoint = frame_pts[local_last] if local_last < len(frame_pts) else None
+            entries.append((clip_paths[video_idx], inpoint, outpoint, None))
+        if clip_end >= last_frame:
+            break
+        clip_start = clip_end
+    return entries
+
+def encode_segments(input_args_for, duration, fps, effect, output_path, job_id=None, pre_filters=None, post_filters=None):
+    """
+    Encode a timeline as independent segments in parallel ffmpeg processes.
+    
+    Args:
+        input_args_for: Callable (segment_index, first_frame, frame_count) returning the
+            ffmpeg input arguments for a segment
+        duration: Total timeline duration in seconds
+        fps: Output frame rate (number, string like "30000/1001" or Fraction)
+        effect: Key in VIDEO_EFFECTS
+        output_path: Final output path (used to name the segment files)
+        job_id: Optional job ID for progress updates
+        pre_filters: Optional filters applied before the effect
+        post_filters: Optional filters applied after the effect
+    
+    Returns:
+        List of segment paths in timeline order
+    """
+    bounds = segment_bounds(duration, fps)
+    threads_per_segment = max(1, (os.cpu_count() or 1) // SEGMENT_ENCODE_WORKERS)
+    segment_paths = [
+        os.path.join(UPLOAD_FOLDER, f"segment_{idx:04d}_{os.path.basename(output_path)}")
+        for idx in range(len(bounds))
+    ]
+    print(f"Segmented encode: {len(bounds)} segment(s), {SEGMENT_ENCODE_WORKERS} worker(s), {threads_per_segment} thread(s) each")
+    
+    done = [0]
+    lock = threading.Lock()
+    # Encoded seconds and current encode fps per segment, combined into one status
+    segment_out_time = [0.0] * len(bounds)
+    segment_fps = [0.0] * len(bounds)
+    encode_start = time.time()
+    last_update = [0.0]
+    
+    def report_progress(force=False):
+        now = time.time()
+        if not job_id or (now - last_update[0] < PROGRESS_UPDATE_INTERVAL and not force):
+            return
+        last_update[0] = now
+        out_time = sum(segment_out_time)
+        elapsed = now - encode_start
+        speed = out_time / elapsed if elapsed > 0 else None
+        progress = 25 + int(55 * min(1.0, out_time / duration)) if duration else 25
+        status_data = {'encode_path': 'segmented'}
+        status_data.update(progress_details(out_time, sum(segment_fps), speed, duration))
+        update_status(job_id, 'processing', progress, f'Video-Encoding läuft... ({done[0]}/{len(bounds)} Segmente)', status_data)
+    
+    def encode_one(idx):
+        start, first_frame, frame_count = bounds[idx]
+        cmd_segment = [
+            'ffmpeg', '-y',
+            *input_args_for(idx, first_frame, frame_count),
+            # Timestamps are shifted so time-dependent filters see the timeline time t
+            '-vf', build_video_filter(effect, pre_filters, time_offset=start, post_filters=post_filters),
+            '-frames:v', str(frame_count),
+            *x264_encode_args(),
+            '-an',
+            '-threads', str(threads_per_segment),
+            segment_paths[idx]
+        ]
         
+        def on_progress(info):
+            # Segments keep the source timestamps (-copyts), so progress is counted in frames
+            with lock:
+                segment_out_time[idx] = float(min(info['frame'], frame_count) / Fraction(fps))
+                segment_fps[idx] = 0.0 if info['done'] else (info['fps'] or 0.0)
+                report_progress()
+        
+        result = run_ffmpeg(cmd_segment, timeout=7200, on_progress=on_progress)
+        if result.returncode != 0:
+            print(f"FFmpeg segment {idx+1} stderr: {result.stderr[-500:]}")
+            raise Exception(f"FFmpeg segment error: {result.stderr[-200:]}")
+        with lock:
+            done[0] += 1
+            print(f"Segment {idx+1}/{len(bounds)} encoded ({done[0]} done)")
+            report_progress(force=True)
+    
+    try:
+        with ThreadPoolExecutor(max_workers=SEGMENT_ENCODE_WORKERS) as executor:
+            # list() re-raises the first segment error
+            list(executor.map(encode_one, range(len(bounds))))
+        return segment_paths
+    except Exception:
+        for path in segment_paths:
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+
+def join_segments_with_audio(segment_paths, audio_path, duration, output_path, job_id=None, silence_lines=None):
+    """
+    Join encoded segments by stream copy and mux the audio into the final MP4.
+    
+    With a silence_lines list, silencedetect runs on the audio in the same pass.
+    """
+    segment_list_path = os.path.join(UPLOAD_FOLDER, f"segments_{os.path.basename(output_path)}.txt")
+    try:
+        write_concat_list(segment_list_path, [(path, None, None, None) for path in segment_paths])
+        
+        cmd_join = [
+            'ffmpeg', '-y',
+            '-f', 'concat',
+            '-safe', '0',
+            '-i', segment_list_path,
+            '-i', audio_path,
+            '-t', str(duration),
+            '-c:v', 'copy',
+            *mux_audio_args(audio_path),
+            '-map', '0:v:0',
+            '-map', '1:a:0',
+            '-movflags', '+faststart',
+            output_path
+        ]
+        if silence_lines is not None:
+            cmd_join.extend(silence_detect_output(1))
+        print(f"Joining {len(segment_paths)} segments with audio...")
+        result = run_ffmpeg(cmd_join, timeout=1800, on_progress=status_progress(
+            job_id, 80, 95, 'Segmente werden zusammengefügt...', duration, {'encode_path': 'segmented'}
+        ), on_stderr=silence_collector(silence_lines))
+        if result.returncode != 0:
+            print(f"FFmpeg join stderr: {result.stderr[-500:]}")
+            raise Exception(f"FFmpeg join error: {result.stderr[-200:]}")
+        return True
+    finally:
+        for path in [segment_list_path, *segment_paths]:
+            if os.path.exists(path):
+                os.remove(path)
+
+def loop_clip_with_audio(clip_path, audio_path, duration, output_path, job_id=None, encode_path='still_loop', silence_lines=None):
+    """
+    Repeat an encoded clip by stream copy for the audio duration and mux the audio into
+    the final MP4.
+    
+    The audio is cut by -t, the video by a frame count: the last frame ends at or before
+    the audio end, so a low frame rate clip does not overshoot by up to one frame
+    (-shortest would end its slow video stream early instead). With a silence_lines
+    list, silencedetect runs on the audio in the same pass.
+    """
+    clip_fps = parse_frame_rate((probe_media(clip_path) or {}).get('r_frame_rate'))
+    video_frames = max(1, int(Fraction(duration).limit_denominator(1000000) * clip_fps))
+    cmd_loop = [
+        'ffmpeg', '-y',
+        '-stream_loop', '-1',
+        '-i', clip_path,
+        '-i', audio_path,
+        '-t', str(duration),
+        '-frames:v', str(video_frames),
+        '-c:v', 'copy',
+        *mux_audio_args(audio_path),
+        '-map', '0:v:0',
+        '-map', '1:a:0',
+        '-movflags', '+faststart',
+        output_path
+    ]
+    if silence_lines is not None:
+        cmd_loop.extend(silence_detect_output(1))
+    print(f"Looping {os.path.basename(clip_path)} with audio...")
+    result = run_ffmpeg(cmd_loop, timeout=1800, on_progress=status_progress(
+        job_id, 60, 95, 'Audio wird hinzugefügt...', duration, {'encode_path': encode_path}
+    ), on_stderr=silence_collector(silence_lines))
+    if result.returncode != 0:
+        print(f"FFmpeg loop stderr: {result.stderr[-500:]}")
+        raise Exception(f"FFmpeg loop error: {result.stderr[-200:]}")
+    return True
+
+def format_duration(seconds):
+    """Format seconds to readable time"""
+    hours = int(seconds // 3600)
+    minutes = int((seconds % 3600) // 60)
+    secs = int(seconds % 60)
+    
+    if hours > 0:
+        return f"{hours}h {minutes}min {secs}s"
+    elif minutes > 0:
+        return f"{minutes}min {secs}s"
+    else:
+        return f"{secs}s"
+
+def format_size(bytes):
+    """Format bytes to readable size"""
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if bytes < 1024.0:
+            return f"{bytes:.2f} {unit}"
+        bytes /= 1024.0
+    return f"{bytes:.2f} TB"
+
+def seconds_to_hhmmss(seconds):
+    """Konvertiert Sekunden zu HH:MM:SS Format"""
+    hours = int(seconds // 3600)
+    minutes = int((seconds % 3600) // 60)
+    secs = int(seconds % 60)
+    
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}"
+
+def trim_video_frames(input_path, output_path, frames_to_trim=7):
+    """
+    Trim N frames from the end of a video file.
+    
+    Args:
+        input_path: Path to the input video file
+        output_path: Path to save the trimmed video file
+        frames_to_trim: Number of frames to trim from the end (default: 7)
+    
+    Returns:
+        True if successful, raises exception otherwise
+    """
+    try:
+        # Get framerate and duration with a single probe
+        info = probe_media(input_path)
+        if not info or not info['fps']:
+            raise Exception("Could not determine video frame rate")
+        fps = info['fps']
+        print(f"Video FPS: {fps}")
+        
+        original_duration = info['duration']
+        print(f"Original duration: {original_duration} seconds")
+        
+        # Calculate duration to trim
+        trim_seconds = frames_to_trim / fps
+        new_duration = original_duration - trim_seconds
+        
+        print(f"Trimming {frames_to_trim} frames (~{trim_seconds:.3f} seconds) from end")
+        print(f"New duration: {new_duration} seconds")
+        
+        if new_duration <= 0:
+            raise Exception(f"Video too short to trim {frames_to_trim} frames")
+        
+        # Use FFmpeg to trim the video (stream copy for speed)
+        cmd_trim = [
+            'ffmpeg', '-y',
+            '-i', input_path,
+            '-t', str(new_duration),
+            '-c:v', 'copy',
+            '-c:a', 'copy',
+            output_path
+        ]
+        
+        print(f"Running trim: {' '.join(cmd_trim[:8])}...")
+        result = run_ffmpeg(cmd_trim, timeout=600)
+        
+        if result.returncode != 0:
+            print(f"FFmpeg trim stderr: {result.stderr[-500:]}")
+            raise Exception(f"FFmpeg trim error: {result.stderr[-200:]}")
+        
+        print(f"Video trimmed successfully: {format_size(os.path.getsize(output_path))}")
+        return True
+        
+    except Exception as e:
+        print(f"Error trimming video: {e}")
+        raise
+
+def silence_detect_filter(noise_threshold=-30, silence_duration=1):
+    """silencedetect filter used to find song changes"""
+    return f'silencedetect=noise={noise_threshold}dB:d={silence_duration}'
+
+def silence_detect_output(input_index, noise_threshold=-30, silence_duration=1):
+    """
+    Extra null output that runs silencedetect on an input's audio.
+    
+    Appended after the real output of an encode, so the audio is decoded once
+    for both and the silences are known when the encode ends.
+    """
+    return ['-map', f'{input_index}:a:0', '-af', silence_detect_filter(noise_threshold, silence_duration), '-f', 'null', '-']
+
+def silence_collector(silence_lines):
+    """run_ffmpeg on_stderr callback that keeps only the silencedetect lines"""
+    if silence_lines is None:
+        return None
+    
+    def collect_silence(line):
+        if 'silence_' in line:
+            silence_lines.append(line)
+    return collect_silence
+
+def analysis_chunks(duration, silence_duration):
+    """
+    (start, length) of the silence analysis chunks.
+    
+    Each chunk reaches past the next chunk's start by more than silence_duration,
+    so a silence across a boundary is long enough to be detected in one of them.
+    """
+    overlap = silence_duration + 1
+    chunks = []
+    start = 0.0
+    while start < duration:
+        chunks.append((start, min(TRACKLIST_CHUNK_DURATION + overlap, duration - start)))
+        start += TRACKLIST_CHUNK_DURATION
+    return chunks
+
+def parse_silence_intervals(silence_lines, offset=0.0, stream_end=None):
+    """
+    (start, end) silences from silencedetect lines, shifted by offset.
+    
+    A silence still running at the end of the stream ends at stream_end, or is dropped without one.
+    """
+    intervals = []
+    silence_start = None
+    for line in silence_lines:
+        match = re.search(r'silence_(start|end): (-?[\d.]+)', line)
+        if not match:
+            continue
+        value = offset + float(match.group(2))
+        if match.group(1) == 'start':
+            silence_start = value
+        elif silence_start is not None:
+            intervals.append((silence_start, value))
+            silence_start = None
+        else:
+            intervals.append((offset, value))
+    if silence_start is not None and stream_end is not None:
+        intervals.append((silence_start, stream_end))
+    return intervals
+
+def merge_silence_intervals(intervals, tolerance=0.05):
+    """Join overlapping silences, e.g. the same silence seen by two analysis chunks"""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1] + tolerance:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+def detect_silences(audio_path, duration, noise_threshold=-30, silence_duration=1, job_id=None):
+    """
+    Find silences with a low-rate mono decode, in overlapping chunks analysed in parallel.
+    
+    Returns:
+        Merged (start, end) silences in seconds
+    """
+    chunks = analysis_chunks(duration, silence_duration)
+    print(f"[Tracklist] Analysing {format_duration(duration)} in {len(chunks)} chunk(s) with {TRACKLIST_WORKERS} worker(s)")
+    
+    def analyse_chunk(chunk):
+        chunk_start, chunk_length = chunk
+        cmd = [
+            'ffmpeg',
+            '-ss', f'{chunk_start:.3f}',
+            '-t', f'{chunk_length:.3f}',
+            '-i', audio_path,
+            '-vn', '-sn', '-dn',
+            '-af', f'aformat=channel_layouts=mono,aresample={TRACKLIST_SAMPLE_RATE},{silence_detect_filter(noise_threshold, silence_duration)}',
+            '-f', 'null', '-'
+        ]
+        silence_lines = []
+        result = run_ffmpeg(cmd, timeout=max(300, chunk_length), on_stderr=silence_collector(silence_lines))
+        if result.returncode != 0:
+            raise Exception(f"FFmpeg silencedetect error: {result.stderr[-200:]}")
+        return parse_silence_intervals(silence_lines, chunk_start, chunk_start + chunk_length)
+    
+    intervals = []
+    with ThreadPoolExecutor(max_workers=TRACKLIST_WORKERS) as executor:
+        futures = [executor.submit(analyse_chunk, chunk) for chunk in chunks]
+        for done, future in enumerate(as_completed(futures), 1):
+            intervals.extend(future.result())
+            if job_id:
+                update_status(job_id, 'processing', 10 + 80 * done // len(chunks), f'Analysiere Audio ({done}/{len(chunks)})...')
+    return merge_silence_intervals(intervals)
+
+def create_tracklist(audio_path, file_id, noise_threshold=-30, silence_duration=1, job_id=None):
+    """
+    Erstellt eine Trackliste basierend auf erkannten Liedwechseln (eigene Analyse ohne Encode)
+    Format: MM:SS - Song Name
+    
+    Args:
+        audio_path: Pfad zur Audio-Datei
+        file_id: Eindeutige ID für die Datei
+        noise_threshold: Dezibel-Schwelle für Stille
+        silence_duration: Mindestdauer der Stille
+        job_id: Job für Fortschrittsmeldungen
+    
+    Returns:
+        Pfad zur erstellten TXT-Datei
+    """
+    try:
+        print(f"[Tracklist] Creating tracklist for {file_id}")
+        audio_duration = get_video_duration(audio_path)
+        silences = detect_silences(audio_path, audio_duration, noise_threshold, silence_duration, job_id)
+    except Exception as e:
+        print(f"[Tracklist] Error creating tracklist: {e}")
+        import traceback
+        print(traceback.format_exc())
+        return None
+    
+    return write_tracklist(silences, audio_duration, file_id)
+
+def write_tracklist(silences, audio_duration, file_id):
+    """
+    Schreibt die Trackliste aus erkannten Stille-Abschnitten
+    Format: MM:SS - Song Name
+    
+    Args:
+        silences: (Start, Ende) der Stille-Abschnitte in Sekunden
+        audio_duration: Dauer der Audio-Datei in Sekunden
+        file_id: Eindeutige ID für die Datei
+    
+    Returns:
+        Pfad zur erstellten TXT-Datei
+    """
+    try:
         # Create list of track start times
         track_times = []
         
@@ -1120,12 +2350,10 @@ def create_tracklist(audio_path, file_id, noise_threshold=-30, silence_duration=
         track_times.append(0.0)
         
         # Additional tracks start after each detected silence
-        for i in range(len(silence_ends)):
-            if i < len(silence_ends):
-                start_time = float(silence_ends[i])
-                # Only add if it's before the end of the audio
-                if start_time < audio_duration:
-                    track_times.append(start_time)
+        for _, start_time in silences:
+            # Only add if it's before the end of the audio
+            if start_time < audio_duration:
+                track_times.append(start_time)
         
         # Remove duplicates and sort
         track_times = sorted(list(set(track_times)))
@@ -1183,36 +2411,144 @@ def create_audio_tracklist(audio_paths, file_id):
         return None
 
 
-def merge_audio_files(audio_paths, output_path, status_path=None):
-    """Merge multiple audio files into a single MP3."""
+def audio_merge_plan(audio_paths, audio_format='mp3'):
+    """
+    Decide per input how it gets into the stream-copied output.
+    
+    The target parameters are those covering the most playtime among inputs already in
+    the output codec with the highest channel count (44.1 kHz stereo if there is none). Inputs with these parameters are used as
+    they are, or remuxed if they have another container or extra streams (cover art);
+    only the others are transcoded.
+    
+    Returns:
+        (target, actions): target (codec, sample_rate, channels) and one of
+        'copy', 'remux' or 'transcode' per input
+    """
+    output_format = AUDIO_MERGE_FORMATS[audio_format]
+    infos = [probe_media(path) or {} for path in audio_paths]
+    params = [(info.get('audio_codec'), info.get('sample_rate'), info.get('channels')) for info in infos]
+    max_channels = max((p[2] or 0 for p in params), default=0)
+    weights = {}
+    for info, param in zip(infos, params):
+        # Never downmix the other inputs just to copy one of them
+        if param[0] == output_format['codec'] and param[1] and param[2] == max_channels:
+            weights[param] = weights.get(param, 0) + (info.get('duration') or 0)
+    target = max(weights, key=weights.get) if weights else (output_format['codec'], 44100, 2)
+    
+    actions = []
+    for path, info, param in zip(audio_paths, infos, params):
+        if param != target:
+            actions.append('transcode')
+        elif info.get('format_name') != output_format['format_name'] or info.get('video_codec'):
+            actions.append('remux')
+        else:
+            actions.append('copy')
+    return target, actions
+
+def merge_audio_files(audio_paths, output_path, job_id=None, audio_format='mp3'):
+    """
+    Merge multiple audio files into a single MP3 (or M4A).
+    
+    Inputs matching the output codec and parameters are joined by the concat demuxer
+    with stream copy; only the odd files out are transcoded to that format first, in
+    parallel (AUDIO_MERGE_WORKERS), each by its own ffmpeg process.
+    """
+    output_format = AUDIO_MERGE_FORMATS[audio_format]
+    part_paths = []
+    concat_list_path = os.path.join(UPLOAD_FOLDER, f"concat_{os.path.basename(output_path)}.txt")
     try:
-        if status_path:
-            update_status(status_path, 'processing', 15, 'Analysiere Audiodateien...')
+        if job_id:
+            update_status(job_id, 'processing', 15, 'Analysiere Audiodateien...')
 
-        duration = sum(get_video_duration(path) for path in audio_paths)
+        durations = [get_video_duration(path) for path in audio_paths]
+        duration = sum(durations)
         print(f"Total audio duration: {duration} seconds ({duration/60:.1f} minutes)")
 
-        if status_path:
-            update_status(status_path, 'processing', 30, 'Erstelle MP3...')
-
-        cmd = ['ffmpeg', '-y']
-        for path in audio_paths:
-            cmd.extend(['-i', path])
-
-        concat_inputs = ''.join(f'[{i}:a:0]' for i in range(len(audio_paths)))
-        concat_filter = f'{concat_inputs}concat=n={len(audio_paths)}:v=0:a=1[out]'
-        cmd.extend([
-            '-filter_complex', concat_filter,
-            '-map', '[out]',
-            '-c:a', 'libmp3lame',
-            '-b:a', '192k',
-            '-ar', '44100',
-            '-ac', '2',
-            output_path
-        ])
+        target, actions = audio_merge_plan(audio_paths, audio_format)
+        codec, sample_rate, channels = target
+        print(f"Audio merge target: {codec} {sample_rate} Hz, {channels} channel(s); "
+              f"{actions.count('copy')} copy, {actions.count('remux')} remux, {actions.count('transcode')} transcode")
+
+        base = os.path.splitext(os.path.basename(output_path))[0]
+        sources = list(audio_paths)
+        to_convert = [idx for idx, action in enumerate(actions) if action != 'copy']
+        for idx in to_convert:
+            sources[idx] = os.path.join(UPLOAD_FOLDER, f"audio_part_{idx:03d}_{base}.{audio_format}")
+            part_paths.append(sources[idx])
 
+        done = [0]
+        lock = threading.Lock()
+        # Converted seconds and percent per input (copied inputs count as finished), combined into one status
+        file_out_time = [0.0] * len(audio_paths)
+        file_progress = [0 if action != 'copy' else 100 for action in actions]
+        convert_seconds = sum(durations[idx] for idx in to_convert)
+        last_update = [0.0]
+
+        def report_progress(force=False):
+            now = time.time()
+            if not job_id or (now - last_update[0] < PROGRESS_UPDATE_INTERVAL and not force):
+                return
+            last_update[0] = now
+            out_time = sum(file_out_time)
+            progress = 20 + int(40 * min(1.0, out_time / convert_seconds)) if convert_seconds else 20
+            update_status(job_id, 'processing', progress, f'Konvertiere Audiodateien ({done[0]}/{len(to_convert)})...', {
+                'converted_files': done[0],
+                'convert_total': len(to_convert),
+                'file_progress': list(file_progress)
+            })
+
+        def convert_one(idx):
+            if actions[idx] == 'remux':
+                codec_args = ['-c:a', 'copy']
+            else:
+                codec_args = [*output_format['encode_args'], '-ar', str(sample_rate), '-ac', str(channels)]
+            cmd_part = ['ffmpeg', '-y', '-i', audio_paths[idx], '-map', '0:a:0', *codec_args, sources[idx]]
+
+            def on_progress(info):
+                with lock:
+                    file_out_time[idx] = min(info['out_time'], durations[idx])
+                    if durations[idx]:
+                        file_progress[idx] = int(100 * file_out_time[idx] / durations[idx])
+                    report_progress()
+
+            print(f"{actions[idx].capitalize()}: {os.path.basename(audio_paths[idx])}")
+            result = run_ffmpeg(cmd_part, timeout=1800, on_progress=on_progress)
+            if result.returncode != 0:
+                print(f"FFmpeg {actions[idx]} stderr: {result.stderr[-500:]}")
+                raise Exception(f"FFmpeg audio {actions[idx]} error: {result.stderr[-200:]}")
+            with lock:
+                done[0] += 1
+                file_out_time[idx] = durations[idx]
+                file_progress[idx] = 100
+                report_progress(force=True)
+
+        if to_convert:
+            print(f"Converting {len(to_convert)} audio file(s) with {AUDIO_MERGE_WORKERS} worker(s)")
+            if job_id:
+                report_progress(force=True)
+            with ThreadPoolExecutor(max_workers=AUDIO_MERGE_WORKERS) as executor:
+                # list() re-raises the first conversion error
+                list(executor.map(convert_one, to_convert))
+
+        write_concat_list(concat_list_path, [(path, None, None, None) for path in sources])
+        cmd = [
+            'ffmpeg', '-y',
+            '-f', 'concat',
+            '-safe', '0',
+            '-i', concat_list_path,
+            '-map', '0:a:0',
+            '-c:a', 'copy'
+        ]
+        if audio_format == 'm4a':
+            cmd.extend(['-movflags', '+faststart'])
+        cmd.append(output_path)
+
+        if job_id:
+            update_status(job_id, 'processing', 60, f'Erstelle {audio_format.upper()}...')
         print(f"Running: {' '.join(cmd[:10])}...")
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=1800)
+        result = run_ffmpeg(cmd, timeout=1800, on_progress=status_progress(
+            job_id, 60, 70, f'Erstelle {audio_format.upper()}...', duration
+        ))
 
         if result.returncode != 0:
             print(f"FFmpeg merge stderr: {result.stderr[-500:]}")
@@ -1221,9 +2557,9 @@ def merge_audio_files(audio_paths, output_path, status_path=None):
             raise Exception(f"FFmpeg audio merge error: {result.stderr[-200:]}")
 
         print(f"Audio merge completed: {output_path}")
-        if status_path:
-            update_status(status_path, 'processing', 70, 'MP3 wird finalisiert...')
-        return True
+        if job_id:
+            update_status(job_id, 'processing', 70, f'{audio_format.upper()} wird finalisiert...')
+        return {'audio_format': audio_format, 'copied_files': actions.count('copy') + actions.count('remux'), 'transcoded_files': actions.count('transcode')}
     except subprocess.TimeoutExpired as e:
         print(f"FFmpeg timeout after {e.timeout} seconds")
         if os.path.exists(output_path):
@@ -1237,10 +2573,18 @@ def merge_audio_files(audio_paths, output_path, status_path=None):
             except:
                 pass
         raise
+    finally:
+        for path in [concat_list_path, *part_paths]:
+            if os.path.exists(path):
+                os.remove(path)
 
 
-def merge_video_audio_from_image(audio_path, image_path, output_path, status_path=None, effect='none'):
-    """Create video from static image with audio and optional effects"""
+def merge_video_audio_from_image(audio_path, image_path, output_path, job_id=None, effect='none', single_pass=SINGLE_PASS_ENCODE, silence_lines=None, max_height=DEFAULT_MAX_HEIGHT, max_fps=DEFAULT_MAX_FPS):
+    """
+    Create video from static image with audio and optional effects (silencedetect fused into the audio pass).
+    
+    Images above max_height are scaled down before the effect; max_fps limits the frame rate.
+    """
     try:
         # Get audio duration
         duration = get_video_duration(audio_path)
@@ -1250,121 +2594,206 @@ def merge_video_audio_from_image(audio_path, image_path, output_path, status_pat
         if effect != 'none':
             print(f"Applying effect: {effect}")
         
-        if status_path:
+        if job_id:
             effect_text = f' + {effect} Effekt' if effect != 'none' else ''
-            update_status(status_path, 'processing', 20, f'Erstelle Video aus Standbild{effect_text}...')
+            update_status(job_id, 'processing', 20, f'Erstelle Video aus Standbild{effect_text}...')
         
         temp_video = os.path.join(UPLOAD_FOLDER, f"temp_image_video_{os.path.basename(output_path)}")
-        
-        print("Step 1: Creating video from image...")
-        start_time = time.time()
-        
-        # Build FFmpeg command
-        cmd_image_to_video = [
-            'ffmpeg', '-y',
-            '-loop', '1',
-            '-i', image_path,
-            '-t', str(duration)
-        ]
-        
-        # Add video filter if effect is selected
-        if effect != 'none' and effect in VIDEO_EFFECTS and VIDEO_EFFECTS[effect]['filter']:
-            print(f"Applying video filter: {VIDEO_EFFECTS[effect]['filter']}")
+        cap_filters = delivery_filters([image_path], max_height)
+        # Zoompan effects always put out IMAGE_FRAME_RATE, so a lower cap is applied after the effect
+        frame_rate = min(IMAGE_FRAME_RATE, max_fps) if max_fps else IMAGE_FRAME_RATE
+        post_filters = [f"fps={frame_rate}"] if frame_rate < IMAGE_FRAME_RATE else []
+        # Loop clips must end on a frame of both rates
+        loop_window = effect_loop_window(effect, math.gcd(IMAGE_FRAME_RATE, frame_rate))
+        if not (effect in VIDEO_EFFECTS and VIDEO_EFFECTS[effect]['filter']):
+            encode_path = 'still_loop'
+        elif loop_window and duration > loop_window:
+            encode_path = 'effect_loop'
+        elif use_segmented_encode(effect, duration):
+            encode_path = 'segmented'
+        else:
+            encode_path = 'reencode'
+        
+        if encode_path in ('still_loop', 'effect_loop'):
+            # The output repeats: encode one clip and repeat it by stream copy
+            start_time = time.time()
+            if encode_path == 'still_loop':
+                # Nothing moves: a short low-frame-rate clip, one GOP long
+                loop_seconds = min(STILL_IMAGE_LOOP_SECONDS, max(1, int(duration) + 1))
+                input_rate = clip_rate = STILL_IMAGE_FRAME_RATE
+                clip_frames = clip_rate * loop_seconds
+                clip_filter = build_video_filter(effect, cap_filters)
+                encode_args = still_image_encode_args(clip_frames)
+                message = 'Standbild wird kodiert...'
+            else:
+                # Periodic effect: whole periods at the normal frame rate
+                loop_seconds = float(loop_window)
+                input_rate = IMAGE_FRAME_RATE
+                clip_rate = frame_rate
+                clip_frames = int(loop_window * clip_rate)
+                clip_filter = build_video_filter(effect, cap_filters, post_filters=post_filters)
+                encode_args = loop_clip_encode_args()
+                message = f'{effect} Effekt wird für {loop_seconds:g} Sekunden gerendert...'
+            cmd_clip = [
+                'ffmpeg', '-y',
+                '-loop', '1',
+                '-framerate', str(input_rate),
+                '-i', image_path,
+                '-frames:v', str(clip_frames)
+            ]
+            if clip_filter:
+                cmd_clip.extend(['-vf', clip_filter])
+            cmd_clip.extend([
+                *encode_args,
+                '-an',
+                temp_video
+            ])
+            print(f"{encode_path}: encoding {loop_seconds:g}s ({clip_frames} frames at {clip_rate} fps) and looping it...")
+            if job_id:
+                update_status(job_id, 'processing', 30, message, {'encode_path': encode_path})
+            result_clip = run_ffmpeg(cmd_clip, timeout=1800, on_progress=status_progress(
+                job_id, 30, 60, message, loop_seconds, {'encode_path': encode_path}
+            ))
+            if result_clip.returncode != 0:
+                print(f"FFmpeg stderr: {result_clip.stderr[-500:]}")
+                raise Exception(f"FFmpeg error: {result_clip.stderr[-200:]}")
+            
+            if job_id:
+                update_status(job_id, 'processing', 60, 'Audio wird hinzugefügt...', {'encode_path': encode_path})
+            loop_clip_with_audio(temp_video, audio_path, duration, output_path, job_id, encode_path, silence_lines)
+            os.remove(temp_video)
+            print(f"Looped image video completed in {time.time() - start_time:.1f} seconds")
+        elif encode_path == 'segmented':
+            # Encode the timeline in parallel segments, then join them by stream copy
+            print("Segmented: Creating video from image in parallel segments...")
+            start_time = time.time()
+            # The looped image is bounded by the segment length in time: effects that lower the
+            # frame rate (fps=) would otherwise run past the segment until -frames:v is reached
+            segment_paths = encode_segments(
+                lambda idx, first_frame, frame_count: [
+                    '-loop', '1', '-framerate', str(IMAGE_FRAME_RATE),
+                    '-t', str(float(Fraction(frame_count) / Fraction(frame_rate))),
+                    '-i', image_path
+                ],
+                duration, frame_rate, effect, output_path, job_id, cap_filters, post_filters
+            )
+            if job_id:
+                update_status(job_id, 'processing', 80, 'Segmente werden zusammengefügt...', {'encode_path': encode_path})
+            join_segments_with_audio(segment_paths, audio_path, duration, output_path, job_id, silence_lines)
+            encoding_time = time.time() - start_time
+            print(f"Segmented encode completed in {encoding_time/60:.1f} minutes")
+        else:
+            if single_pass:
+                print("Single pass: Creating video from image and adding audio...")
+            else:
+                print("Step 1: Creating video from image...")
+            start_time = time.time()
+        
+            # Build FFmpeg command
+            cmd_image_to_video = [
+                'ffmpeg', '-y',
+                '-loop', '1',
+                '-framerate', str(IMAGE_FRAME_RATE),
+                '-i', image_path
+            ]
+            if single_pass:
+                cmd_image_to_video.extend(['-i', audio_path])
+            cmd_image_to_video.extend(['-t', str(duration)])
+        
+            # Add video filter if effect is selected or the image is above the output cap
+            video_filter = build_video_filter(effect, cap_filters, post_filters=post_filters)
+            if video_filter:
+                print(f"Applying video filter: {video_filter}")
+                cmd_image_to_video.extend([
+                    '-vf', video_filter
+                ])
+        
+            # Add encoding parameters
+            cmd_image_to_video.extend(x264_encode_args())
+            if single_pass:
+                cmd_image_to_video.extend(mux_audio_args(audio_path))
+                cmd_image_to_video.extend([
+                    '-map', '0:v:0',
+                    '-map', '1:a:0'
+                ])
             cmd_image_to_video.extend([
-                '-vf', VIDEO_EFFECTS[effect]['filter']
+                '-movflags', '+faststart',
+                '-threads', '0',
+                output_path if single_pass else temp_video
             ])
+            if single_pass and silence_lines is not None:
+                cmd_image_to_video.extend(silence_detect_output(1))
         
-        # Add encoding parameters
-        cmd_image_to_video.extend([
-            '-c:v', 'libx264',
-            '-preset', 'fast',
-            '-crf', '28',
-            '-profile:v', 'high',
-            '-level', '4.2',
-            '-pix_fmt', 'yuv420p',
-            '-maxrate', '10M',
-            '-bufsize', '20M',
-            '-g', '250',
-            '-movflags', '+faststart',
-            '-threads', '0',
-            temp_video
-        ])
-        
-        print(f"Running: {' '.join(cmd_image_to_video[:10])}...")
-        
-        if status_path:
-            est_minutes = int((duration / 300))  # Images are faster to encode
-            update_status(status_path, 'processing', 30, f'Video-Encoding läuft... (~{est_minutes} Min)')
-        
-        result_video = subprocess.run(
-            cmd_image_to_video,
-            capture_output=True,
-            text=True,
-            timeout=7200
-        )
-        
-        encoding_time = time.time() - start_time
-        print(f"Video creation completed in {encoding_time/60:.1f} minutes")
+            print(f"Running: {' '.join(cmd_image_to_video[:10])}...")
         
-        if result_video.returncode != 0:
-            print(f"FFmpeg stderr: {result_video.stderr[-500:]}")
-            raise Exception(f"FFmpeg error: {result_video.stderr[-200:]}")
+            if job_id:
+                update_status(job_id, 'processing', 30, 'Video-Encoding läuft...', {'encode_path': encode_path})
         
-        video_size = os.path.getsize(temp_video)
-        print(f"Video created: {format_size(video_size)}")
+            result_video = run_ffmpeg(cmd_image_to_video, timeout=7200, on_progress=status_progress(
+                job_id, 30, 95 if single_pass else 80, 'Video-Encoding läuft...', duration, {'encode_path': encode_path}
+            ), on_stderr=silence_collector(silence_lines) if single_pass else None)
         
-        if status_path:
-            update_status(status_path, 'processing', 80, 'Audio wird hinzugefügt...')
+            encoding_time = time.time() - start_time
+            print(f"Video creation completed in {encoding_time/60:.1f} minutes")
         
-        # Step 2: Merge with audio
-        print("Step 2: Merging audio with video...")
-        cmd_merge = [
-            'ffmpeg', '-y',
-            '-i', temp_video,
-            '-i', audio_path,
-            '-c:v', 'copy',
-            '-c:a', 'aac',
-            '-b:a', '96k',
-            '-ar', '44100',
-            '-map', '0:v:0',
-            '-map', '1:a:0',
-            '-shortest',
-            '-movflags', '+faststart',
-            output_path
-        ]
-        
-        print(f"Running: {' '.join(cmd_merge[:10])}...")
-        
-        result_merge = subprocess.run(
-            cmd_merge,
-            capture_output=True,
-            text=True,
-            timeout=1800
-        )
+            if result_video.returncode != 0:
+                print(f"FFmpeg stderr: {result_video.stderr[-500:]}")
+                raise Exception(f"FFmpeg error: {result_video.stderr[-200:]}")
         
-        if result_merge.returncode != 0:
-            print(f"FFmpeg merge stderr: {result_merge.stderr[-500:]}")
-            if os.path.exists(temp_video):
-                os.remove(temp_video)
-            raise Exception(f"FFmpeg merge error: {result_merge.stderr[-200:]}")
-        
-        # Cleanup
-        if os.path.exists(temp_video):
-            os.remove(temp_video)
-            print("Cleaned up temporary video")
+            if not single_pass:
+                video_size = os.path.getsize(temp_video)
+                print(f"Video created: {format_size(video_size)}")
+            
+                if job_id:
+                    update_status(job_id, 'processing', 80, 'Audio wird hinzugefügt...')
+            
+                # Step 2: Merge with audio
+                print("Step 2: Merging audio with video...")
+                cmd_merge = [
+                    'ffmpeg', '-y',
+                    '-i', temp_video,
+                    '-i', audio_path,
+                    '-t', str(duration),
+                    '-c:v', 'copy',
+                    *mux_audio_args(audio_path),
+                    '-map', '0:v:0',
+                    '-map', '1:a:0',
+                    '-movflags', '+faststart',
+                    output_path
+                ]
+                if silence_lines is not None:
+                    cmd_merge.extend(silence_detect_output(1))
+            
+                print(f"Running: {' '.join(cmd_merge[:10])}...")
+            
+                result_merge = run_ffmpeg(cmd_merge, timeout=1800, on_progress=status_progress(
+                    job_id, 80, 95, 'Audio wird hinzugefügt...', duration, {'encode_path': encode_path}
+                ), on_stderr=silence_collector(silence_lines))
+            
+                if result_merge.returncode != 0:
+                    print(f"FFmpeg merge stderr: {result_merge.stderr[-500:]}")
+                    if os.path.exists(temp_video):
+                        os.remove(temp_video)
+                    raise Exception(f"FFmpeg merge error: {result_merge.stderr[-200:]}")
+            
+                # Cleanup
+                if os.path.exists(temp_video):
+                    os.remove(temp_video)
+                    print("Cleaned up temporary video")
         
         final_size = os.path.getsize(output_path)
         total_time = time.time() - start_time
         print(f"=== IMAGE VIDEO COMPLETE ===")
         print(f"Final file size: {format_size(final_size)}")
         print(f"Total processing time: {total_time/60:.1f} minutes")
+        print(f"Encode path: {encode_path}")
         if effect != 'none':
             print(f"Applied effect: {effect}")
         
-        if status_path:
-            update_status(status_path, 'processing', 95, 'Finalisierung...')
+        if job_id:
+            update_status(job_id, 'processing', 95, 'Finalisierung...', {'encode_path': encode_path})
         
-        return True
+        return {'encode_path': encode_path}
         
     except subprocess.TimeoutExpired as e:
         print(f"FFmpeg timeout after {e.timeout} seconds")
@@ -1380,10 +2809,15 @@ def merge_video_audio_from_image(audio_path, image_path, output_path, status_pat
                 pass
         raise
 
-def merge_video_audio(audio_path, video_paths, output_path, status_path=None, effect='none', trim_frames=False):
-    """Merge video and audio - with random video mixing and optional effects"""
-    import random
+def merge_video_audio(audio_path, video_paths, output_path, job_id=None, effect='none', trim_frames=False, single_pass=SINGLE_PASS_ENCODE, seed=None, silence_lines=None, max_height=DEFAULT_MAX_HEIGHT, max_fps=DEFAULT_MAX_FPS):
+    """
+    Merge video and audio - with random video mixing and optional effects (same seed, same sequence).
     
+    With a silence_lines list, silencedetect runs in the pass that adds the audio.
+    Clips above max_height / max_fps are scaled down before the effect.
+    """
+    prerendered_paths = {}
+    segment_list_paths = []
     try:
         # Get audio duration
         duration = get_video_duration(audio_path)
@@ -1397,14 +2831,22 @@ def merge_video_audio(audio_path, video_paths, output_path, status_path=None, ef
         if effect != 'none':
             print(f"Applying effect: {effect}")
         
-        # Trim frames from end of videos if enabled
+        # Trim frames from end of videos if enabled, then probe each clip.
+        # Clips are prepared concurrently since every clip needs its own probes (and remux in rewrite mode).
         if trim_frames > 0:
-            print(f"Trimming {trim_frames} frames from end of videos...")
-            if status_path:
-                update_status(status_path, 'processing', 12, f'Schneide {trim_frames} Frames ab...')
-            
-            trimmed_video_paths = []
-            for idx, vp in enumerate(video_paths):
+            print(f"Trimming {trim_frames} frames from end of videos ({TRIM_MODE} mode, {TRIM_WORKERS} worker(s))...")
+            if job_id:
+                update_status(job_id, 'processing', 12, f'Schneide {trim_frames} Frames ab...')
+        
+        rewrite_trim = trim_frames > 0 and TRIM_MODE == 'rewrite'
+        outpoint_trim = trim_frames if trim_frames > 0 and not rewrite_trim else 0
+        # Frame timing is needed for outpoint trimming and for segmented encoding
+        need_timing = outpoint_trim > 0 or use_segmented_encode(effect, duration)
+        
+        def prepare_clip(idx):
+            vp = video_paths[idx]
+            applied_trim = 0
+            if rewrite_trim:
                 print(f"Trimming video {idx+1}/{len(video_paths)}: {vp}")
                 # Create a trimmed version with _trimmed suffix
                 base, ext = os.path.splitext(vp)
@@ -1414,25 +2856,48 @@ def merge_video_audio(audio_path, video_paths, output_path, status_path=None, ef
                     # Replace original with trimmed version
                     os.remove(vp)
                     os.rename(trimmed_path, vp)
-                    trimmed_video_paths.append(vp)
+                    applied_trim = trim_frames
                     print(f"Video {idx+1} trimmed successfully")
                 except Exception as e:
                     print(f"Warning: Failed to trim video {idx+1}: {e}")
                     # Continue with untrimmed video
-                    trimmed_video_paths.append(vp)
+                    if os.path.exists(trimmed_path):
+                        os.remove(trimmed_path)
             
-            video_paths = trimmed_video_paths
-        
-        # Get duration of each video
-        video_durations = []
-        for idx, vp in enumerate(video_paths):
-            vd = get_video_duration(vp)
-            video_durations.append(vd)
+            timing = None
+            if need_timing:
+                try:
+                    timing = clip_timing(vp, outpoint_trim)
+                    applied_trim = outpoint_trim
+                    if outpoint_trim:
+                        print(f"Video {idx+1}: keeping {timing['frames']} frames (outpoint {float(timing['outpoint']):.3f}s)")
+                except Exception as e:
+                    print(f"Warning: Failed to trim video {idx+1}: {e}" if outpoint_trim else f"Warning: No frame timing for video {idx+1}: {e}")
+                    if outpoint_trim:
+                        # Continue with untrimmed video
+                        try:
+                            timing = clip_timing(vp)
+                        except Exception:
+                            timing = None
+            
+            # Get duration of the (trimmed) video
+            vd = timing['duration'] if timing else get_video_duration(vp)
             print(f"Video {idx+1} duration: {vd} seconds")
-        
-        if status_path:
+            return vd, timing, applied_trim
+        
+        trim_start = time.time()
+        with ThreadPoolExecutor(max_workers=TRIM_WORKERS) as executor:
+            prepared = list(executor.map(prepare_clip, range(len(video_paths))))
+        video_durations = [vd for vd, _, _ in prepared]
+        clip_timings = [timing for _, timing, _ in prepared]
+        # Frames actually removed from every clip (0 if trimming failed for one of them)
+        trim_count = min(applied for _, _, applied in prepared)
+        trim_seconds = round(time.time() - trim_start, 1)
+        print(f"Clip preparation completed in {trim_seconds} seconds")
+        
+        if job_id:
             effect_text = f' + {effect} Effekt' if effect != 'none' else ''
-            update_status(status_path, 'processing', 15, f'{len(video_paths)} Video(s) werden analysiert{effect_text}...')
+            update_status(job_id, 'processing', 15, f'{len(video_paths)} Video(s) werden analysiert{effect_text}...', {'trim_seconds': trim_seconds})
         
         # Calculate clips needed
         avg_video_duration = sum(video_durations) / len(video_durations)
@@ -1441,140 +2906,238 @@ def merge_video_audio(audio_path, video_paths, output_path, status_path=None, ef
         print(f"Average video duration: {avg_video_duration:.2f} seconds")
         print(f"Total clips needed: ~{total_clips_needed}")
         
-        if status_path:
-            update_status(status_path, 'processing', 20, f'Erstelle zufällige Video-Sequenz ({total_clips_needed} Clips)...')
+        if job_id:
+            update_status(job_id, 'processing', 20, f'Erstelle zufällige Video-Sequenz ({total_clips_needed} Clips)...')
         
         # Create paths
         concat_list_path = os.path.join(UPLOAD_FOLDER, f"concat_{os.path.basename(output_path)}.txt")
         temp_looped_video = os.path.join(UPLOAD_FOLDER, f"temp_looped_{os.path.basename(output_path)}")
         
+        # Clips above the output cap are scaled down before the effect, so they have to be re-encoded
+        cap_filters = delivery_filters(video_paths, max_height, max_fps)
+        fps_capped = any(f.startswith('fps=') for f in cap_filters)
+        
+        # A stream-copy cut keeps whole packets in decode order; with B-frames decoded after
+        # the cut it drops more frames than trimmed, and the clips are re-encoded instead
+        copy_exact = all(not t or t['copy_frames'] == t['frames'] for t in clip_timings)
+        if not copy_exact:
+            print("Concat copy not possible: the trim cut would drop B-frames, re-encoding clips")
+        
+        # Without an effect, delivery-compatible clips can be joined without re-encoding
+        copy_concat = effect == 'none' and not cap_filters and copy_exact and can_concat_copy(video_paths)
+        if copy_concat:
+            # Stream copy can only cut after whole packets in decode order, which may drop a few more frames
+            video_durations = [
+                float(timing['copy_duration']) if timing and timing['copy_duration'] is not None else vd
+                for vd, timing in zip(video_durations, clip_timings)
+            ]
+        
         # Generate random sequence
-        print("Generating random video sequence...")
+        print(f"Generating random video sequence (seed {seed})...")
+        rng = random.Random(seed)
         current_time = 0
         clip_sequence = []
         
         while current_time < duration:
-            video_idx = random.randint(0, len(video_paths) - 1)
+            video_idx = rng.randint(0, len(video_paths) - 1)
             clip_sequence.append(video_idx)
             current_time += video_durations[video_idx]
         
         print(f"Generated sequence with {len(clip_sequence)} clips")
         print(f"Video distribution: {[clip_sequence.count(i) for i in range(len(video_paths))]}")
         
-        # Create FFmpeg concat file
-        with open(concat_list_path, 'w') as f:
-            for video_idx in clip_sequence:
-                video_path_escaped = video_paths[video_idx].replace("'", "'\\''")
-                f.write(f"file '{video_path_escaped}'\n")
+        encode_path = 'concat_copy' if copy_concat else 'reencode'
+        concat_sources = video_paths
+        
+        # Static effects do not depend on the timeline time, so each clip only needs to be rendered once;
+        # the same goes for clips without an effect that cannot be cut exactly by stream copy
+        # (frame limits count source frames, so not with a frame rate cap)
+        used_indices = sorted(set(clip_sequence))
+        if ((VIDEO_EFFECTS.get(effect, {}).get('category') == 'static' or (effect == 'none' and not copy_exact))
+                and len(clip_sequence) > len(used_indices)
+                and not fps_capped
+                and clips_share_geometry(video_paths)):
+            encode_path = 'prerender_copy'
+            if job_id:
+                render_text = f'{effect} Effekt wird auf {len(used_indices)} Clip(s) angewendet...' if effect != 'none' else f'{len(used_indices)} Clip(s) werden frame-genau geschnitten...'
+                update_status(job_id, 'processing', 22, render_text, {'encode_path': encode_path})
+            frame_limits = {i: t['frames'] for i, t in enumerate(clip_timings) if t and t['outpoint'] is not None}
+            prerendered_paths = prerender_static_effect(video_paths, used_indices, effect, output_path, frame_limits, cap_filters)
+            concat_sources = [prerendered_paths.get(i, vp) for i, vp in enumerate(video_paths)]
+            copy_concat = True
+        
+        # Long re-encodes are split into segments that are encoded in parallel
+        # (segment bounds count source frames, so not with a frame rate cap)
+        segmented = (not copy_concat
+                     and not fps_capped
+                     and use_segmented_encode(effect, duration)
+                     and all(clip_timings)
+                     and clips_share_geometry(video_paths))
+        if segmented:
+            encode_path = 'segmented'
+            segment_fps = parse_frame_rate(probe_media(video_paths[0])['r_frame_rate'])
+        print(f"Encode path: {encode_path}")
+        
+        # Create FFmpeg concat file; trimmed clips get outpoint directives
+        concat_entries = []
+        for video_idx in clip_sequence:
+            timing = clip_timings[video_idx]
+            if prerendered_paths or not timing or timing['outpoint'] is None:
+                concat_entries.append((concat_sources[video_idx], None, None, None))
+            elif copy_concat:
+                concat_entries.append((concat_sources[video_idx], None, timing['copy_outpoint'], timing['copy_duration']))
+            else:
+                concat_entries.append((concat_sources[video_idx], None, timing['outpoint'], None))
+        write_concat_list(concat_list_path, concat_entries)
+        
+        # Re-encodes drop the frames decoded past an outpoint (frame-exact trim)
+        exact_trim = not copy_concat and any(outpoint is not None for _, _, outpoint, _ in concat_entries)
+        pre_filters = (['select=concatdec_select'] if exact_trim else []) + cap_filters
         
         print(f"Concat list created: {concat_list_path}")
         
-        if status_path:
-            est_minutes = int((duration / 200))
+        if copy_concat:
+            progress_message = 'Clips werden ohne Neukodierung zusammengefügt...'
+        else:
             effect_note = f' ({effect} Effekt)' if effect != 'none' else ''
-            update_status(status_path, 'processing', 25, f'Video-Encoding läuft{effect_note}... (~{est_minutes} Min)')
-        
-        # Step 1: Concatenate videos with optional effect
-        print("Step 1: Creating concatenated video with optional effect...")
-        start_time = time.time()
-        
-        # Build FFmpeg command with optional video filter
-        cmd_concat = [
-            'ffmpeg', '-y',
-            '-f', 'concat',
-            '-safe', '0',
-            '-i', concat_list_path,
-            '-t', str(duration)
-        ]
-        
-        # Add video filter if effect is selected
-        if effect != 'none' and effect in VIDEO_EFFECTS and VIDEO_EFFECTS[effect]['filter']:
-            print(f"Applying video filter: {VIDEO_EFFECTS[effect]['filter']}")
+            progress_message = f'Video-Encoding läuft{effect_note}...'
+        if job_id:
+            update_status(job_id, 'processing', 25, progress_message, {'encode_path': encode_path})
+        
+        if segmented:
+            # Encode the timeline in parallel segments, then join them by stream copy
+            print("Segmented: Encoding timeline in parallel segments...")
+            start_time = time.time()
+            def segment_input_args(idx, first_frame, frame_count):
+                segment_list_path = os.path.join(UPLOAD_FOLDER, f"segment_{idx:04d}_{os.path.basename(output_path)}.txt")
+                segment_list_paths.append(segment_list_path)
+                write_concat_list(segment_list_path, segment_concat_entries(clip_sequence, video_paths, clip_timings, first_frame, frame_count))
+                return ['-copyts', '-f', 'concat', '-safe', '0', '-segment_time_metadata', '1', '-i', segment_list_path]
+            
+            segment_paths = encode_segments(
+                segment_input_args, duration, segment_fps, effect, output_path, job_id,
+                pre_filters=['select=concatdec_select', *cap_filters]
+            )
+            if job_id:
+                update_status(job_id, 'processing', 80, 'Segmente werden zusammengefügt...', {'encode_path': encode_path})
+            join_segments_with_audio(segment_paths, audio_path, duration, output_path, job_id, silence_lines)
+            encoding_time = time.time() - start_time
+            print(f"Segmented encode completed in {encoding_time/60:.1f} minutes")
+        else:
+            # Step 1: Concatenate videos with optional effect
+            if copy_concat:
+                print("Fast path: Concatenating videos with stream copy and adding audio...")
+            elif single_pass:
+                print("Single pass: Concatenating videos and adding audio...")
+            else:
+                print("Step 1: Creating concatenated video with optional effect...")
+            start_time = time.time()
+        
+            # Build FFmpeg command with optional video filter
+            cmd_concat = [
+                'ffmpeg', '-y',
+                '-f', 'concat',
+                '-safe', '0'
+            ]
+            if exact_trim:
+                cmd_concat.extend(['-segment_time_metadata', '1'])
+            cmd_concat.extend(['-i', concat_list_path])
+            if single_pass or copy_concat:
+                cmd_concat.extend(['-i', audio_path])
+            cmd_concat.extend(['-t', str(duration)])
+        
+            if copy_concat:
+                cmd_concat.extend(['-c:v', 'copy'])
+            else:
+                # Add video filter if effect is selected or trims need frame selection
+                video_filter = build_video_filter(effect, pre_filters)
+                if video_filter:
+                    print(f"Applying video filter: {video_filter}")
+                    cmd_concat.extend([
+                        '-vf', video_filter
+                    ])
+            
+                # Add encoding parameters
+                cmd_concat.extend(x264_encode_args())
+            if single_pass or copy_concat:
+                cmd_concat.extend(mux_audio_args(audio_path))
+                cmd_concat.extend([
+                    '-map', '0:v:0',
+                    '-map', '1:a:0'
+                ])
+            else:
+                cmd_concat.append('-an')
             cmd_concat.extend([
-                '-vf', VIDEO_EFFECTS[effect]['filter']
+                '-movflags', '+faststart',
+                '-threads', '0',
+                output_path if single_pass or copy_concat else temp_looped_video
             ])
+            with_audio = single_pass or copy_concat
+            if with_audio and silence_lines is not None:
+                cmd_concat.extend(silence_detect_output(1))
         
-        # Add encoding parameters
-        cmd_concat.extend([
-            '-c:v', 'libx264',
-            '-preset', 'fast',
-            '-crf', '28',
-            '-profile:v', 'high',
-            '-level', '4.2',
-            '-pix_fmt', 'yuv420p',
-            '-maxrate', '10M',
-            '-bufsize', '20M',
-            '-g', '250',
-            '-movflags', '+faststart',
-            '-an',
-            '-threads', '0',
-            temp_looped_video
-        ])
-        
-        print(f"Running: {' '.join(cmd_concat[:10])}...")
+            print(f"Running: {' '.join(cmd_concat[:10])}...")
         
-        result_concat = subprocess.run(
-            cmd_concat,
-            capture_output=True,
-            text=True,
-            timeout=7200
-        )
+            result_concat = run_ffmpeg(cmd_concat, timeout=7200, on_progress=status_progress(
+                job_id, 25, 95 if with_audio else 80, progress_message, duration, {'encode_path': encode_path}
+            ), on_stderr=silence_collector(silence_lines) if with_audio else None)
         
-        encoding_time = time.time() - start_time
-        print(f"Concatenation completed in {encoding_time/60:.1f} minutes")
+            encoding_time = time.time() - start_time
+            print(f"Concatenation completed in {encoding_time/60:.1f} minutes")
         
-        if result_concat.returncode != 0:
-            print(f"FFmpeg concat stderr: {result_concat.stderr[-500:]}")
-            if os.path.exists(concat_list_path):
-                os.remove(concat_list_path)
-            raise Exception(f"FFmpeg concat error: {result_concat.stderr[-200:]}")
+            if result_concat.returncode != 0:
+                print(f"FFmpeg concat stderr: {result_concat.stderr[-500:]}")
+                if os.path.exists(concat_list_path):
+                    os.remove(concat_list_path)
+                raise Exception(f"FFmpeg concat error: {result_concat.stderr[-200:]}")
         
-        # Remove concat list
+        # Remove concat lists and pre-rendered clips
         if os.path.exists(concat_list_path):
             os.remove(concat_list_path)
+        for path in [*prerendered_paths.values(), *segment_list_paths]:
+            if os.path.exists(path):
+                os.remove(path)
         
-        concat_size = os.path.getsize(temp_looped_video)
-        print(f"Concatenated video created: {format_size(concat_size)}")
-        
-        if status_path:
-            update_status(status_path, 'processing', 80, 'Audio wird hinzugefügt...')
-        
-        # Step 2: Merge with audio
-        print("Step 2: Merging audio with video...")
-        cmd_merge = [
-            'ffmpeg', '-y',
-            '-i', temp_looped_video,
-            '-i', audio_path,
-            '-c:v', 'copy',
-            '-c:a', 'aac',
-            '-b:a', '96k',
-            '-ar', '44100',
-            '-map', '0:v:0',
-            '-map', '1:a:0',
-            '-shortest',
-            '-movflags', '+faststart',
-            output_path
-        ]
-        
-        print(f"Running: {' '.join(cmd_merge[:10])}...")
-        
-        result_merge = subprocess.run(
-            cmd_merge,
-            capture_output=True,
-            text=True,
-            timeout=1800
-        )
-        
-        if result_merge.returncode != 0:
-            print(f"FFmpeg merge stderr: {result_merge.stderr[-500:]}")
+        if not single_pass and not copy_concat and not segmented:
+            concat_size = os.path.getsize(temp_looped_video)
+            print(f"Concatenated video created: {format_size(concat_size)}")
+            
+            if job_id:
+                update_status(job_id, 'processing', 80, 'Audio wird hinzugefügt...')
+            
+            # Step 2: Merge with audio
+            print("Step 2: Merging audio with video...")
+            cmd_merge = [
+                'ffmpeg', '-y',
+                '-i', temp_looped_video,
+                '-i', audio_path,
+                '-t', str(duration),
+                '-c:v', 'copy',
+                *mux_audio_args(audio_path),
+                '-map', '0:v:0',
+                '-map', '1:a:0',
+                '-movflags', '+faststart',
+                output_path
+            ]
+            if silence_lines is not None:
+                cmd_merge.extend(silence_detect_output(1))
+            
+            print(f"Running: {' '.join(cmd_merge[:10])}...")
+            
+            result_merge = run_ffmpeg(cmd_merge, timeout=1800, on_progress=status_progress(
+                job_id, 80, 95, 'Audio wird hinzugefügt...', duration, {'encode_path': encode_path}
+            ), on_stderr=silence_collector(silence_lines))
+            
+            if result_merge.returncode != 0:
+                print(f"FFmpeg merge stderr: {result_merge.stderr[-500:]}")
+                if os.path.exists(temp_looped_video):
+                    os.remove(temp_looped_video)
+                raise Exception(f"FFmpeg merge error: {result_merge.stderr[-200:]}")
+            
+            # Cleanup
             if os.path.exists(temp_looped_video):
                 os.remove(temp_looped_video)
-            raise Exception(f"FFmpeg merge error: {result_merge.stderr[-200:]}")
-        
-        # Cleanup
-        if os.path.exists(temp_looped_video):
-            os.remove(temp_looped_video)
-            print("Cleaned up temporary video")
+                print("Cleaned up temporary video")
         
         final_size = os.path.getsize(output_path)
         total_time = time.time() - start_time
@@ -1582,13 +3145,14 @@ def merge_video_audio(audio_path, video_paths, output_path, status_path=None, ef
         print(f"Final file size: {format_size(final_size)}")
         print(f"Total processing time: {total_time/60:.1f} minutes")
         print(f"Used {len(clip_sequence)} clips from {len(video_paths)} video(s)")
+        print(f"Encode path: {encode_path}")
         if effect != 'none':
             print(f"Applied effect: {effect}")
         
-        if status_path:
-            update_status(status_path, 'processing', 95, 'Finalisierung...')
+        if job_id:
+            update_status(job_id, 'processing', 95, 'Finalisierung...', {'encode_path': encode_path, 'trim_seconds': trim_seconds, 'trim_count': trim_count})
         
-        return True
+        return {'encode_path': encode_path, 'trim_seconds': trim_seconds, 'trim_count': trim_count}
         
     except subprocess.TimeoutExpired as e:
         print(f"FFmpeg timeout after {e.timeout} seconds")
@@ -1596,6 +3160,9 @@ def merge_video_audio(audio_path, video_paths, output_path, status_path=None, ef
             os.remove(temp_looped_video)
         if 'concat_list_path' in locals() and os.path.exists(concat_list_path):
             os.remove(concat_list_path)
+        for path in [*prerendered_paths.values(), *segment_list_paths]:
+            if os.path.exists(path):
+                os.remove(path)
         raise Exception(f"Video processing timeout - took longer than {e.timeout/60:.0f} minutes")
     except Exception as e:
         print(f"Merge error: {e}")
@@ -1609,8 +3176,184 @@ def merge_video_audio(audio_path, video_paths, output_path, status_path=None, ef
                 os.remove(concat_list_path)
             except:
                 pass
+        for path in [*prerendered_paths.values(), *segment_list_paths]:
+            try:
+                if os.path.exists(path):
+                    os.remove(path)
+            except:
+                pass
         raise
 
+ZIP64_LIMIT = 0xFFFFFFFF
+
+def zip_dos_datetime(timestamp):
+    """DOS time and date fields of a ZIP entry"""
+    t = time.localtime(timestamp)
+    year = max(1980, t.tm_year)
+    return (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2), ((year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+
+def zip_local_header(entry):
+    """Local file header; CRC and sizes follow in the data descriptor"""
+    zip64 = entry['size'] >= ZIP64_LIMIT
+    extra = struct.pack('<HHQQ', 0x0001, 16, 0, 0) if zip64 else b''
+    return struct.pack(
+        '<IHHHHHIIIHH',
+        0x04034b50, 45 if zip64 else 20, 0x0808, 0, entry['dos_time'], entry['dos_date'],
+        0, ZIP64_LIMIT if zip64 else 0, ZIP64_LIMIT if zip64 else 0,
+        len(entry['name']), len(extra)
+    ) + entry['name'] + extra
+
+def zip_data_descriptor(entry, crc):
+    """Data descriptor written after the file data"""
+    if entry['size'] >= ZIP64_LIMIT:
+        return struct.pack('<IIQQ', 0x08074b50, crc, entry['size'], entry['size'])
+    return struct.pack('<IIII', 0x08074b50, crc, entry['size'], entry['size'])
+
+def zip_central_header(entry, crc, offset):
+    """Central directory header of an entry"""
+    zip64_fields = []
+    if entry['size'] >= ZIP64_LIMIT:
+        zip64_fields.extend([entry['size'], entry['size']])
+    if offset >= ZIP64_LIMIT:
+        zip64_fields.append(offset)
+    extra = struct.pack(f'<HH{len(zip64_fields)}Q', 0x0001, 8 * len(zip64_fields), *zip64_fields) if zip64_fields else b''
+    version = 45 if zip64_fields else 20
+    size = ZIP64_LIMIT if entry['size'] >= ZIP64_LIMIT else entry['size']
+    return struct.pack(
+        '<IHHHHHHIIIHHHHHII',
+        0x02014b50, (3 << 8) | version, version, 0x0808, 0, entry['dos_time'], entry['dos_date'],
+        crc, size, size, len(entry['name']), len(extra), 0, 0, 0, 0o100644 << 16,
+        min(offset, ZIP64_LIMIT)
+    ) + entry['name'] + extra
+
+def zip_end_records(entry_count, directory_offset, directory_size):
+    """End of central directory, preceded by the ZIP64 records when needed"""
+    records = b''
+    if entry_count >= 0xFFFF or directory_offset >= ZIP64_LIMIT or directory_size >= ZIP64_LIMIT:
+        zip64_end_offset = directory_offset + directory_size
+        records += struct.pack(
+            '<IQHHIIQQQQ',
+            0x06064b50, 44, 45, 45, 0, 0, entry_count, entry_count, directory_size, directory_offset
+        )
+        records += struct.pack('<IIQI', 0x07064b50, 0, zip64_end_offset, 1)
+    records += struct.pack(
+        '<IHHHHIIH',
+        0x06054b50, 0, 0, min(entry_count, 0xFFFF), min(entry_count, 0xFFFF),
+        min(directory_size, ZIP64_LIMIT), min(directory_offset, ZIP64_LIMIT), 0
+    )
+    return records
+
+def stored_zip_entries(files):
+    """
+    Describe files for a stored (uncompressed) ZIP.
+    
+    Args:
+        files: List of (file_path, arcname) tuples
+    
+    Returns:
+        List of entry dicts (path, name, size, dos_time, dos_date)
+    """
+    entries = []
+    for file_path, arcname in files:
+        st = os.stat(file_path)
+        dos_time, dos_date = zip_dos_datetime(st.st_mtime)
+        entries.append({
+            'path': file_path,
+            'name': arcname.encode('utf-8'),
+            'size': st.st_size,
+            'dos_time': dos_time,
+            'dos_date': dos_date,
+        })
+    return entries
+
+def stored_zip_size(entries):
+    """Exact size of the archive stream_stored_zip() produces for the entries"""
+    offset = 0
+    directory_size = 0
+    for entry in entries:
+        directory_size += len(zip_central_header(entry, 0, offset))
+        offset += len(zip_local_header(entry)) + entry['size'] + len(zip_data_descriptor(entry, 0))
+    return offset + directory_size + len(zip_end_records(len(entries), offset, directory_size))
+
+def stream_stored_zip(entries):
+    """
+    Generate a ZIP archive with stored (uncompressed) entries chunk by chunk.
+    
+    Media files are already compressed, so entries are stored as they are. The
+    CRC is computed while reading and written into a data descriptor after each
+    file, so memory use does not depend on the file size.
+    """
+    offset = 0
+    central_directory = []
+    for entry in entries:
+        header = zip_local_header(entry)
+        yield header
+        crc = 0
+        remaining = entry['size']
+        with open(entry['path'], 'rb') as f:
+            while remaining > 0:
+                chunk = f.read(min(ZIP_STREAM_CHUNK_SIZE, remaining))
+                if not chunk:
+                    raise IOError(f"File shrank while streaming: {entry['path']}")
+                crc = zlib.crc32(chunk, crc)
+                remaining -= len(chunk)
+                yield chunk
+        descriptor = zip_data_descriptor(entry, crc)
+        yield descriptor
+        central_directory.append(zip_central_header(entry, crc, offset))
+        offset += len(header) + entry['size'] + len(descriptor)
+    
+    directory = b''.join(central_directory)
+    yield directory
+    yield zip_end_records(len(entries), offset, len(directory))
+
+def bundle_files(file_id, file_path, tracklist_path):
+    """Files and archive names of the output + tracklist download"""
+    return [
+        (file_path, f"merged_{file_id}{os.path.splitext(file_path)[1]}"),
+        (tracklist_path, f"tracklist_{file_id}.txt")
+    ]
+
+def write_download_bundle(file_id, file_path, tracklist_path):
+    """
+    Write the output + tracklist ZIP next to the output.
+    
+    Returns:
+        Path of the bundle
+    """
+    bundle_path = os.path.join(OUTPUT_FOLDER, f"{file_id}_bundle.zip")
+    temp_path = f"{bundle_path}.part"
+    try:
+        with open(temp_path, 'wb') as f:
+            for chunk in stream_stored_zip(stored_zip_entries(bundle_files(file_id, file_path, tracklist_path))):
+                f.write(chunk)
+        os.replace(temp_path, bundle_path)
+        return bundle_path
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def send_output_file(file_path, mimetype, download_name):
+    """
+    Send a file from OUTPUT_FOLDER with Range, ETag and conditional request support.
+    
+    With DOWNLOAD_OFFLOAD='x-accel' only an X-Accel-Redirect header is returned and
+    nginx sends the file; 'x-sendfile' does the same through Flask's X-Sendfile support.
+    """
+    if DOWNLOAD_OFFLOAD == 'x-accel':
+        response = Response(mimetype=mimetype)
+        response.headers['X-Accel-Redirect'] = DOWNLOAD_ACCEL_PREFIX.rstrip('/') + '/' + os.path.relpath(file_path, OUTPUT_FOLDER)
+        response.headers['Content-Disposition'] = f'attachment; filename={download_name}'
+        return response
+    return send_file(
+        file_path,
+        mimetype=mimetype,
+        as_attachment=True,
+        download_name=download_name,
+        conditional=True,
+        etag=True
+    )
+
 def cleanup_old_files():
     """Clean up files older than CLEANUP_AGE_HOURS"""
     while True:
@@ -1618,13 +3361,48 @@ def cleanup_old_files():
             now = datetime.now()
             cutoff = now - timedelta(hours=CLEANUP_AGE_HOURS)
             
+            # Inputs of waiting jobs stay, however old (linked blobs keep their original mtime)
+            active_inputs = active_job_inputs()
             for folder in [UPLOAD_FOLDER, OUTPUT_FOLDER]:
                 for file_path in Path(folder).glob('*'):
-                    if file_path.is_file():
+                    if file_path.is_file() and str(file_path) not in active_inputs:
                         file_time = datetime.fromtimestamp(file_path.stat().st_mtime)
                         if file_time < cutoff:
                             file_path.unlink()
                             print(f"Deleted old file: {file_path}")
+            
+            # Finished jobs expire together with their output files
+            deleted = job_db().execute(
+                "DELETE FROM jobs WHERE status IN ('complete', 'error') AND updated_at < ?",
+                (cutoff.timestamp(),)
+            ).rowcount
+            if deleted:
+                print(f"Deleted {deleted} old job(s)")
+            
+            # Abandoned or unused upload sessions expire with their files
+            with job_transaction() as conn:
+                stale_uploads = [row['upload_id'] for row in conn.execute(
+                    "SELECT upload_id FROM uploads WHERE updated_at < ?", (cutoff.timestamp(),)
+                )]
+                conn.execute("DELETE FROM uploads WHERE updated_at < ?", (cutoff.timestamp(),))
+            with upload_hashers_lock:
+                for upload_id in stale_uploads:
+                    upload_hashers.pop(upload_id, None)
+            if stale_uploads:
+                print(f"Deleted {len(stale_uploads)} old upload session(s)")
+            
+            # Stored uploads go once no job references them and nobody used them for a while;
+            # files are removed inside the transaction so a concurrent upload cannot re-add them meanwhile
+            with job_transaction() as conn:
+                stale_blobs = [row['sha256'] for row in conn.execute(
+                    "SELECT sha256 FROM blobs WHERE refcount <= 0 AND last_used < ?", (cutoff.timestamp(),)
+                )]
+                for sha256 in stale_blobs:
+                    conn.execute("DELETE FROM blobs WHERE sha256 = ?", (sha256,))
+                    if os.path.exists(blob_path(sha256)):
+                        os.remove(blob_path(sha256))
+            if stale_blobs:
+                print(f"Deleted {len(stale_blobs)} unused stored upload(s)")
         except Exception as e:
             print(f"Cleanup error: {e}")
         
@@ -1636,35 +3414,232 @@ def index():
     """Show upload form"""
     return render_template_string(HTML_TEMPLATE)
 
+@app.route('/uploads', methods=['POST'])
+def create_upload():
+    """
+    Start a resumable upload: {filename, size, sha256} -> upload_id
+    
+    If the content-addressed store already has a file with the given SHA-256,
+    the session is complete right away and nothing needs to be transferred.
+    """
+    payload = request.get_json(silent=True) or {}
+    filename = os.path.basename(str(payload.get('filename') or ''))
+    try:
+        size = int(payload.get('size'))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'Dateigröße fehlt'}), 400
+    if not filename or size <= 0:
+        return jsonify({'success': False, 'error': 'Dateiname und Größe benötigt'}), 400
+    if size > MAX_FILE_SIZE:
+        return jsonify({'success': False, 'error': f'Datei zu groß: {format_size(size)} (max {format_size(MAX_FILE_SIZE)})'}), 413
+    sha256 = str(payload.get('sha256') or '').lower() or None
+    if sha256 and not re.fullmatch(r'[0-9a-f]{64}', sha256):
+        return jsonify({'success': False, 'error': 'Ungültige Prüfsumme'}), 400
+    
+    upload_id = str(uuid.uuid4())
+    now = time.time()
+    if sha256:
+        with job_transaction() as conn:
+            # Touching the blob keeps cleanup from deleting it before the job claims it
+            known = conn.execute(
+                "UPDATE blobs SET last_used = ? WHERE sha256 = ? AND size = ?", (now, sha256, size)
+            ).rowcount and os.path.exists(blob_path(sha256))
+            if known:
+                conn.execute(
+                    "INSERT INTO uploads (upload_id, filename, size, received, status, sha256, created_at, updated_at) VALUES (?, ?, ?, ?, 'complete', ?, ?, ?)",
+                    (upload_id, filename, size, size, sha256, now, now)
+                )
+        if known:
+            print(f"[Upload] Session {upload_id} for {filename} reuses stored file (sha256 {sha256[:12]})")
+            return jsonify({
+                'success': True,
+                'upload_id': upload_id,
+                'offset': size,
+                'complete': True,
+                'deduplicated': True,
+                'chunk_size': UPLOAD_CHUNK_SIZE
+            })
+    
+    open(upload_part_path(upload_id), 'wb').close()
+    job_db().execute(
+        "INSERT INTO uploads (upload_id, filename, size, sha256, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+        (upload_id, filename, size, sha256, now, now)
+    )
+    print(f"[Upload] Session {upload_id} for {filename} ({format_size(size)})")
+    return jsonify({
+        'success': True,
+        'upload_id': upload_id,
+        'offset': 0,
+        'chunk_size': UPLOAD_CHUNK_SIZE
+    })
+
+@app.route('/uploads/<upload_id>', methods=['GET'])
+def upload_status(upload_id):
+    """Offset of a resumable upload, to resume after a dropped connection"""
+    row = get_upload(upload_id)
+    if not row:
+        return jsonify({'success': False, 'error': 'Upload nicht gefunden'}), 404
+    # Only open sessions still have a part file; finalizing ones are being moved into the store
+    offset = os.path.getsize(upload_part_path(upload_id)) if row['status'] == 'open' else row['received']
+    return jsonify({
+        'success': True,
+        'upload_id': upload_id,
+        'offset': offset,
+        'size': row['size'],
+        'complete': row['status'] == 'complete'
+    })
+
+@app.route('/uploads/<upload_id>', methods=['PUT'])
+def upload_chunk(upload_id):
+    """Write a chunk at ?offset=<bytes>; a wrong offset answers 409 with the current offset"""
+    row = get_upload(upload_id)
+    if not row or row['status'] != 'open':
+        return jsonify({'success': False, 'error': 'Upload nicht gefunden'}), 404
+    try:
+        offset = int(request.args.get('offset', request.headers.get('Upload-Offset', '')))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Offset fehlt'}), 400
+    length = request.content_length or 0
+    if offset + length > row['size']:
+        return jsonify({'success': False, 'error': 'Chunk überschreitet die Dateigröße'}), 400
+    
+    accepted, received = write_upload_chunk(upload_id, offset, request.stream, length)
+    if not accepted:
+        return jsonify({'success': False, 'error': 'Falscher Offset', 'offset': received}), 409
+    return jsonify({'success': True, 'offset': received})
+
+@app.route('/uploads/<upload_id>/finalize', methods=['POST'])
+def finalize_upload(upload_id):
+    """Complete a resumable upload; the upload_id can then be passed to /upload"""
+    row = get_upload(upload_id)
+    if not row:
+        return jsonify({'success': False, 'error': 'Upload nicht gefunden'}), 404
+    if row['status'] == 'complete':
+        return jsonify({'success': True, 'upload_id': upload_id, 'size': row['size'], 'sha256': row['sha256']})
+    
+    part_path = upload_part_path(upload_id)
+    received = os.path.getsize(part_path)
+    if received != row['size']:
+        return jsonify({'success': False, 'error': 'Upload unvollständig', 'offset': received}), 409
+    claimed = job_db().execute(
+        "UPDATE uploads SET status = 'finalizing', updated_at = ? WHERE upload_id = ? AND status = 'open'",
+        (time.time(), upload_id)
+    ).rowcount
+    if not claimed:
+        return jsonify({'success': False, 'error': 'Upload wird bereits abgeschlossen'}), 409
+    
+    with upload_hashers_lock:
+        hasher_offset, hasher = upload_hashers.pop(upload_id, (None, None))
+    try:
+        sha256 = hasher.hexdigest() if hasher_offset == received else file_sha256(part_path)
+        if row['sha256'] and row['sha256'] != sha256:
+            # The client announced different content: the transfer was corrupted
+            os.remove(part_path)
+            job_db().execute("DELETE FROM uploads WHERE upload_id = ?", (upload_id,))
+            print(f"[Upload] Session {upload_id} checksum mismatch")
+            return jsonify({'success': False, 'error': 'Prüfsumme stimmt nicht überein, bitte erneut hochladen'}), 400
+        store_blob(part_path, sha256, received)
+    except Exception as e:
+        # Reopen the session so finalize can be retried; without the part file it has to start over
+        print(f"[Upload] Session {upload_id} finalize error: {e}")
+        if os.path.exists(part_path):
+            job_db().execute("UPDATE uploads SET status = 'open', updated_at = ? WHERE upload_id = ?", (time.time(), upload_id))
+        else:
+            job_db().execute("DELETE FROM uploads WHERE upload_id = ?", (upload_id,))
+        return jsonify({'success': False, 'error': 'Upload konnte nicht abgeschlossen werden, bitte erneut versuchen'}), 500
+    job_db().execute(
+        "UPDATE uploads SET status = 'complete', sha256 = ?, received = ?, updated_at = ? WHERE upload_id = ?",
+        (sha256, received, time.time(), upload_id)
+    )
+    print(f"[Upload] Session {upload_id} complete ({format_size(received)}, sha256 {sha256[:12]})")
+    return jsonify({'success': True, 'upload_id': upload_id, 'size': received, 'sha256': sha256})
+
 @app.route('/upload', methods=['POST'])
-def upload():
-    """Handle file upload and start background processing"""
+@app.route('/tracklist', methods=['POST'], defaults={'mode': 'tracklist'})
+def upload(mode=None):
+    """Handle file upload and start background processing (/tracklist: tracklist-only job for one audio file)"""
     audio_path = None
     audio_paths = []
     video_paths = []
     image_path = None
+    input_blobs = {}  # job input path -> stored upload (SHA-256)
     
     try:
         print("=== UPLOAD START ===")
         
-        mode = request.form.get('mode', 'video')  # 'video', 'image' or 'audio'
+        # Reject early while the backlog is too deep
+        retry_after = queue_retry_after()
+        if retry_after is not None:
+            print(f"REJECTED: Queue full, retry after {retry_after} seconds")
+            return queue_full_response(retry_after)
+        
+        mode = mode or request.form.get('mode', 'video')  # 'video', 'image', 'audio' or 'tracklist'
         print(f"Mode: {mode}")
         
         # Get selected effect
         effect = request.form.get('effect', 'none')
-        if effect not in VIDEO_EFFECTS:
+        if effect not in VIDEO_EFFECTS or mode == 'tracklist':
             effect = 'none'
         print(f"Selected effect: {effect}")
         
+        # Silence detection settings (tracklist mode)
+        noise_threshold = -30
+        silence_duration = 1
+        if mode == 'tracklist':
+            try:
+                noise_threshold = float(request.form.get('noise_threshold', noise_threshold))
+                silence_duration = float(request.form.get('silence_duration', silence_duration))
+            except ValueError:
+                raise ValueError('Ungültige Einstellungen für die Stille-Erkennung')
+            if not -90 <= noise_threshold <= 0 or not 0.1 <= silence_duration <= 60:
+                raise ValueError('Stille-Schwelle muss zwischen -90 und 0 dB, Mindestdauer zwischen 0.1 und 60 Sekunden liegen')
+            print(f"Silence detection: {noise_threshold} dB, {silence_duration} s")
+        
+        # Output format of the audio merge mode
+        audio_format = request.form.get('audio_format', 'mp3')
+        if audio_format not in AUDIO_MERGE_FORMATS:
+            raise ValueError(f'Unbekanntes Audioformat: {audio_format}')
+        
+        # Output cap (video and image mode): height of the 16:9 box and frame rate, 0 keeps the source
+        try:
+            max_height = int(request.form.get('max_height') or DEFAULT_MAX_HEIGHT)
+            max_fps = int(request.form.get('max_fps') or DEFAULT_MAX_FPS)
+        except ValueError:
+            raise ValueError('Ungültige Ausgabeauflösung oder Bildrate')
+        if not (max_height == 0 or 144 <= max_height <= 4320) or not 0 <= max_fps <= 120:
+            raise ValueError('Ausgabeauflösung muss zwischen 144 und 4320 Pixeln, Bildrate zwischen 1 und 120 fps liegen (0 = wie Quelle)')
+        if mode in ('video', 'image'):
+            print(f"Output cap: {max_height or 'source'}p, {max_fps or 'source'} fps")
+        
         # Get trim_frames option (only relevant in video mode)
         trim_frames = int(request.form.get('trim_frames', '7'))
         print(f"Trim frames count: {trim_frames}")
         
+        # Seed of the random clip sequence; without one a seed is drawn, so the result can be reproduced
+        seed = None
+        if mode == 'video':
+            try:
+                seed = int(request.form.get('seed') or random.randrange(2**31))
+            except ValueError:
+                raise ValueError('Ungültiger Seed')
+            print(f"Seed: {seed}")
+        
         # Generate unique ID
         file_id = str(uuid.uuid4())
         print(f"Generated file_id: {file_id}")
         
-        if mode == 'audio':
+        # Files come either from finalized resumable uploads (IDs) or as multipart files
+        if mode == 'audio' and request.form.getlist('audio_uploads'):
+            for idx, upload_id in enumerate(request.form.getlist('audio_uploads')):
+                path, sha256 = claim_upload(upload_id, os.path.join(UPLOAD_FOLDER, f"{file_id}_audio_{idx}"))
+                audio_paths.append(path)
+                input_blobs[path] = sha256
+                print(f"Audio {idx+1} taken from upload {upload_id}")
+            
+            if len(audio_paths) < 2:
+                print("ERROR: Not enough audio uploads")
+                return jsonify({'success': False, 'error': 'Mindestens 2 Audiodateien benötigt'}), 400
+        elif mode == 'audio':
             if 'audios' not in request.files:
                 print("ERROR: Missing audio files")
                 return jsonify({'success': False, 'error': 'Mindestens 2 Audiodateien benötigt'}), 400
@@ -1688,6 +3663,10 @@ def upload():
             if len(audio_paths) < 2:
                 print("ERROR: Not enough valid audio files")
                 return jsonify({'success': False, 'error': 'Mindestens 2 gültige Audiodateien benötigt'}), 400
+        elif request.form.get('audio_upload'):
+            audio_path, sha256 = claim_upload(request.form['audio_upload'], os.path.join(UPLOAD_FOLDER, f"{file_id}_audio"))
+            input_blobs[audio_path] = sha256
+            print(f"Audio taken from upload {request.form['audio_upload']}")
         else:
             if 'audio' not in request.files:
                 print("ERROR: Missing audio file")
@@ -1706,7 +3685,11 @@ def upload():
             print(f"Audio saved: {os.path.getsize(audio_path)} bytes")
         
             # Handle mode-specific files
-        if mode == 'image':
+        if mode == 'image' and request.form.get('image_upload'):
+            image_path, sha256 = claim_upload(request.form['image_upload'], os.path.join(UPLOAD_FOLDER, f"{file_id}_image"))
+            input_blobs[image_path] = sha256
+            print(f"Image taken from upload {request.form['image_upload']}")
+        elif mode == 'image':
             if 'image' not in request.files:
                 print("ERROR: Missing image file")
                 return jsonify({'success': False, 'error': 'Standbild benötigt'}), 400
@@ -1722,6 +3705,12 @@ def upload():
             print(f"Saving image: {image_file.filename}")
             image_file.save(image_path)
             print(f"Image saved: {os.path.getsize(image_path)} bytes")
+        elif mode == 'video' and request.form.getlist('video_uploads'):
+            for idx, upload_id in enumerate(request.form.getlist('video_uploads')):
+                path, sha256 = claim_upload(upload_id, os.path.join(UPLOAD_FOLDER, f"{file_id}_video_{idx}"))
+                video_paths.append(path)
+                input_blobs[path] = sha256
+                print(f"Video {idx+1} taken from upload {upload_id}")
         elif mode == 'video':
             if 'videos' not in request.files:
                 print("ERROR: Missing video files")
@@ -1748,14 +3737,13 @@ def upload():
                 print("ERROR: No valid video files")
                 return jsonify({'success': False, 'error': 'Keine gültigen Video-Dateien'}), 400
         
-        output_path = os.path.join(OUTPUT_FOLDER, f"{file_id}.{ 'mp3' if mode == 'audio' else 'mp4' }")
+        if mode == 'tracklist':
+            output_path = os.path.join(OUTPUT_FOLDER, f"{file_id}_tracklist.txt")
+        else:
+            output_path = os.path.join(OUTPUT_FOLDER, f"{file_id}.{audio_format if mode == 'audio' else 'mp4'}")
         
-        # Create status file
-        status_path = os.path.join(OUTPUT_FOLDER, f"{file_id}_status.json")
-        status_data = {
-            'status': 'processing',
-            'progress': 0,
-            'message': 'Upload erfolgreich - Verarbeitung startet...',
+        # Status fields reported for the whole job
+        status_info = {
             'file_id': file_id,
             'mode': mode,
             'effect': effect,
@@ -1763,28 +3751,100 @@ def upload():
         }
         
         if mode == 'video':
-            status_data['video_count'] = len(video_paths)
+            status_info['video_count'] = len(video_paths)
+            status_info['seed'] = seed
+        if mode in ('video', 'image'):
+            status_info['max_height'] = max_height
+            status_info['max_fps'] = max_fps
+        
+        # Identical submissions are served from the result cache (tracklist jobs are cheap to repeat)
+        cache_key = None
+        cached_data = None
+        if mode != 'tracklist':
+            input_files = audio_paths if mode == 'audio' else [audio_path, *([image_path] if mode == 'image' else video_paths)]
+            input_hashes = [input_blobs.get(path) or file_sha256(path) for path in input_files]
+            cache_key = result_cache_key(
+                input_hashes, mode, effect, status_info['trim_count'], seed,
+                audio_format if mode == 'audio' else None,
+                status_info.get('max_height'), status_info.get('max_fps')
+            )
+            cached_data = lookup_result(cache_key, file_id, output_path)
+        if cached_data is not None:
+            print(f"Result cache hit {cache_key[:12]}, no processing needed")
+            for path in input_files:
+                if os.path.exists(path):
+                    os.remove(path)
+            release_blobs(input_blobs.values())
+            cached_data.update({'file_id': file_id, 'has_bundle': False, 'cached': True})
+            complete_cached_job(file_id, status_info, cached_data)
+            print("=== UPLOAD ACCEPTED - Served from result cache ===")
+            response_data = {
+                'success': True,
+                'job_id': file_id,
+                'mode': mode,
+                'effect': effect,
+                'cached': True,
+                'message': 'Ergebnis aus dem Cache'
+            }
+            if mode == 'video':
+                response_data['video_count'] = len(video_paths)
+                response_data['seed'] = seed
+            return jsonify(response_data)
         
-        with open(status_path, 'w') as f:
-            json.dump(status_data, f)
+        # Output duration for queue estimates
+        if mode == 'audio':
+            media_duration = sum(get_video_duration(path) for path in audio_paths)
+        else:
+            media_duration = get_video_duration(audio_path)
+        estimated_seconds = estimate_processing_seconds(
+            mode, effect, media_duration, video_paths, image_path, max_height, max_fps, audio_paths, audio_format
+        )
+        if estimated_seconds is not None:
+            status_info['estimated_seconds'] = round(estimated_seconds)
         
-        # Start background processing
+        # Queue background processing
         if mode == 'image':
             mode_desc = 'Standbild'
         elif mode == 'audio':
             mode_desc = 'Audio-Zusammenführung'
+        elif mode == 'tracklist':
+            mode_desc = 'Trackliste'
         else:
             mode_desc = f"{len(video_paths)} video(s)"
-        print(f"Starting background processing with {mode_desc} and '{effect}' effect...")
-        
-        thread = threading.Thread(
-            target=process_video_background,
-            args=(file_id, audio_path, audio_paths if mode == 'audio' else [], video_paths if mode == 'video' else None, image_path if mode == 'image' else None, output_path, status_path, effect, mode, trim_frames if mode == 'video' else False)
-        )
-        thread.daemon = True
-        thread.start()
+        print(f"Queueing background processing with {mode_desc} and '{effect}' effect...")
         
-        print(f"=== UPLOAD ACCEPTED - Processing {mode_desc} in background ===")
+        job_params = {
+            'file_id': file_id,
+            'audio_path': audio_path,
+            'audio_paths': audio_paths if mode == 'audio' else [],
+            'video_paths': video_paths if mode == 'video' else None,
+            'image_path': image_path if mode == 'image' else None,
+            'output_path': output_path,
+            'effect': effect,
+            'mode': mode,
+            'trim_frames': trim_frames if mode == 'video' else False,
+            'blobs': list(input_blobs.values()),
+            'seed': seed,
+            'cache_key': cache_key
+        }
+        if mode == 'tracklist':
+            job_params.update({'noise_threshold': noise_threshold, 'silence_duration': silence_duration})
+        elif mode == 'audio':
+            job_params['audio_format'] = audio_format
+        else:
+            job_params.update({'max_height': max_height, 'max_fps': max_fps})
+        queue_info = submit_job(file_id, job_params, status_info, media_duration)
+        if not queue_info:
+            # The queue filled up while the files were uploading
+            retry_after = queue_retry_after() or 30
+            print(f"REJECTED: Queue full, retry after {retry_after} seconds")
+            for path in [audio_path, *audio_paths, *video_paths, image_path]:
+                if path and os.path.exists(path):
+                    os.remove(path)
+            release_blobs(input_blobs.values())
+            return queue_full_response(retry_after)
+        
+        print(f"=== UPLOAD ACCEPTED - Processing {mode_desc} in background (queue position {queue_info['queue_position']}) ===")
         
         # Return immediately with job_id
         response_data = {
@@ -1797,6 +3857,11 @@ def upload():
         
         if mode == 'video':
             response_data['video_count'] = len(video_paths)
+            response_data['seed'] = seed
+        if 'estimated_seconds' in status_info:
+            response_data['estimated_seconds'] = status_info['estimated_seconds']
+        if queue_info['estimated_start_seconds'] > 0:
+            response_data.update(queue_info)
         
         return jsonify(response_data)
         
@@ -1811,51 +3876,85 @@ def upload():
         try:
             if audio_path and os.path.exists(audio_path):
                 os.remove(audio_path)
+            for ap in audio_paths:
+                if os.path.exists(ap):
+                    os.remove(ap)
             for vp in video_paths:
                 if os.path.exists(vp):
                     os.remove(vp)
             if image_path and os.path.exists(image_path):
                 os.remove(image_path)
+            release_blobs(input_blobs.values())
         except:
             pass
         
-        return jsonify({'success': False, 'error': str(e)}), 500
+        # Invalid form values and unknown upload IDs are client errors
+        return jsonify({'success': False, 'error': str(e)}), 400 if isinstance(e, ValueError) else 500
 
-def process_video_background(file_id, audio_path, audio_paths, video_paths, image_path, output_path, status_path, effect='none', mode='video', trim_frames=False):
-    """Background processing function"""
+def process_video_background(file_id, audio_path, audio_paths, video_paths, image_path, output_path, effect='none', mode='video', trim_frames=False, blobs=None, seed=None, cache_key=None, noise_threshold=-30, silence_duration=1, audio_format='mp3', max_height=DEFAULT_MAX_HEIGHT, max_fps=DEFAULT_MAX_FPS):
+    """
+    Background processing function.
+    
+    blobs are the stored uploads the inputs link to; with a cache_key the result
+    is added to the result cache. In 'tracklist' mode output_path is the tracklist
+    and noise_threshold / silence_duration tune the silence detection. max_height /
+    max_fps cap the output of video and image jobs.
+    """
     try:
         if mode == 'image':
             mode_desc = "Standbild"
         elif mode == 'audio':
             mode_desc = "Audio-Zusammenführung"
+        elif mode == 'tracklist':
+            mode_desc = "Trackliste"
         else:
             mode_desc = f"{len(video_paths)} video(s)"
         print(f"[Background] Starting merge for {file_id} with {mode_desc} and '{effect}' effect")
         
         # Update status: Starting
         effect_text = f' mit {effect} Effekt' if effect != 'none' else ''
+        merge_info = None
+        # Filled by the encode that adds the audio, so the tracklist needs no extra decode
+        silence_lines = []
         
         if mode == 'image':
-            update_status(status_path, 'processing', 10, f'Standbild wird verarbeitet{effect_text}...')
-            merge_video_audio_from_image(audio_path, image_path, output_path, status_path, effect)
+            update_status(file_id, 'processing', 10, f'Standbild wird verarbeitet{effect_text}...')
+            merge_info = merge_video_audio_from_image(audio_path, image_path, output_path, file_id, effect, silence_lines=silence_lines, max_height=max_height, max_fps=max_fps)
         elif mode == 'audio':
-            update_status(status_path, 'processing', 10, 'Analysiere Audiodateien...')
-            merge_audio_files(audio_paths, output_path, status_path)
+            update_status(file_id, 'processing', 10, 'Analysiere Audiodateien...')
+            merge_info = merge_audio_files(audio_paths, output_path, file_id, audio_format)
+        elif mode == 'tracklist':
+            update_status(file_id, 'processing', 10, 'Analysiere Audio...')
+            tracklist_path = create_tracklist(audio_path, file_id, noise_threshold, silence_duration, job_id=file_id)
+            if not tracklist_path:
+                raise Exception('Trackliste konnte nicht erstellt werden')
         else:
-            update_status(status_path, 'processing', 10, f'Analysiere {len(video_paths)} Video(s){effect_text}...')
-            merge_video_audio(audio_path, video_paths, output_path, status_path, effect, trim_frames)
+            update_status(file_id, 'processing', 10, f'Analysiere {len(video_paths)} Video(s){effect_text}...')
+            merge_info = merge_video_audio(audio_path, video_paths, output_path, file_id, effect, trim_frames, seed=seed, silence_lines=silence_lines, max_height=max_height, max_fps=max_fps)
         
         # Get file info
         file_size = os.path.getsize(output_path)
-        duration = get_video_duration(output_path)
+        duration = get_video_duration(audio_path if mode == 'tracklist' else output_path)
         
         # Create tracklist from original audio
-        print("[Background] Creating tracklist...")
-        update_status(status_path, 'processing', 90, 'Erstelle Trackliste...')
-        if mode == 'audio':
-            tracklist_path = create_audio_tracklist(audio_paths, file_id)
-        else:
-            tracklist_path = create_tracklist(audio_path, file_id)
+        if mode != 'tracklist':
+            print("[Background] Creating tracklist...")
+            update_status(file_id, 'processing', 90, 'Erstelle Trackliste...')
+            if mode == 'audio':
+                tracklist_path = create_audio_tracklist(audio_paths, file_id)
+            else:
+                tracklist_path = write_tracklist(parse_silence_intervals(silence_lines), get_video_duration(audio_path), file_id)
+        
+        # Build the download bundle once instead of on every download
+        bundle_path = None
+        if BUNDLE_DOWNLOADS and tracklist_path and mode != 'tracklist':
+            print("[Background] Creating download bundle...")
+            update_status(file_id, 'processing', 95, 'Erstelle Download-Paket...')
+            try:
+                bundle_path = write_download_bundle(file_id, output_path, tracklist_path)
+            except Exception as e:
+                # Downloads fall back to streaming the ZIP
+                print(f"[Background] Bundle error: {e}")
         
         # Clean up input files
         print("[Background] Cleaning up input files...")
@@ -1874,6 +3973,8 @@ def process_video_background(file_id, audio_path, audio_paths, video_paths, imag
         elif mode == 'image':
             if image_path and os.path.exists(image_path):
                 os.remove(image_path)
+        release_blobs(blobs)
+        blobs = None
         
         # Update status: Complete
         complete_data = {
@@ -1883,13 +3984,27 @@ def process_video_background(file_id, audio_path, audio_paths, video_paths, imag
             'file_size_bytes': file_size,
             'effect': effect,
             'mode': mode,
-            'has_tracklist': tracklist_path is not None
+            'has_tracklist': tracklist_path is not None,
+            'has_bundle': bundle_path is not None
         }
         
         if mode == 'video':
             complete_data['video_count'] = len(video_paths)
+            complete_data['seed'] = seed
+        elif mode == 'tracklist':
+            with open(tracklist_path, 'r', encoding='utf-8') as f:
+                complete_data['track_count'] = len(f.read().splitlines())
+        
+        if isinstance(merge_info, dict):
+            complete_data.update(merge_info)
+        
+        try:
+            store_result(cache_key, output_path, tracklist_path, complete_data)
+        except Exception as e:
+            # The job itself succeeded
+            print(f"[Background] Result cache error: {e}")
         
-        update_status(status_path, 'complete', 100, 'Video erfolgreich erstellt!', complete_data)
+        update_status(file_id, 'complete', 100, 'Trackliste erstellt!' if mode == 'tracklist' else 'Video erfolgreich erstellt!', complete_data)
         
         print(f"[Background] === PROCESSING COMPLETE for {file_id} ===")
         
@@ -1899,7 +4014,7 @@ def process_video_background(file_id, audio_path, audio_paths, video_paths, imag
         print(f"[Background] Traceback:\n{traceback.format_exc()}")
         
         # Update status: Error
-        update_status(status_path, 'error', 0, f'Fehler: {str(e)}')
+        update_status(file_id, 'error', 0, f'Fehler: {str(e)}')
         
         # Cleanup on error
         try:
@@ -1915,44 +4030,695 @@ def process_video_background(file_id, audio_path, audio_paths, video_paths, imag
                         os.remove(vp)
             if mode == 'image' and image_path and os.path.exists(image_path):
                 os.remove(image_path)
+            release_blobs(blobs)
         except:
             pass
 
-def update_status(status_path, status, progress, message, data=None):
-    """Update status file"""
+def job_db():
+    """Connection to the job database for the current thread (WAL mode, autocommit)"""
+    conn = getattr(db_local, 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(JOB_DB_PATH, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        db_local.conn = conn
+    return conn
+
+@contextmanager
+def job_transaction():
+    """Write transaction on the job database; the write lock is taken up front"""
+    conn = job_db()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield conn
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+
+def init_job_db():
+    """Create the job, upload session, blob and result cache tables"""
+    job_db().executescript("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            progress INTEGER NOT NULL DEFAULT 0,
+            message TEXT NOT NULL DEFAULT '',
+            info TEXT NOT NULL DEFAULT '{}',
+            data TEXT NOT NULL DEFAULT '{}',
+            params TEXT NOT NULL DEFAULT '{}',
+            media_duration REAL NOT NULL DEFAULT 0,
+            worker TEXT,
+            version INTEGER NOT NULL DEFAULT 1,
+            created_at REAL NOT NULL,
+            started_at REAL,
+            updated_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at);
+        CREATE INDEX IF NOT EXISTS idx_jobs_created ON jobs (created_at);
+        CREATE TABLE IF NOT EXISTS uploads (
+            upload_id TEXT PRIMARY KEY,
+            filename TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            received INTEGER NOT NULL DEFAULT 0,
+            status TEXT NOT NULL DEFAULT 'open',
+            sha256 TEXT,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_uploads_created ON uploads (created_at);
+        CREATE TABLE IF NOT EXISTS blobs (
+            sha256 TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            refcount INTEGER NOT NULL DEFAULT 0,
+            created_at REAL NOT NULL,
+            last_used REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_blobs_unused ON blobs (refcount, last_used);
+        CREATE TABLE IF NOT EXISTS results (
+            cache_key TEXT PRIMARY KEY,
+            output_ext TEXT NOT NULL,
+            has_tracklist INTEGER NOT NULL DEFAULT 0,
+            size INTEGER NOT NULL,
+            data TEXT NOT NULL DEFAULT '{}',
+            created_at REAL NOT NULL,
+            last_used REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_results_used ON results (last_used);
+    """)
+
+def process_token(pid):
+    """Identify a process by PID and start time, so reused PIDs are not mistaken for it"""
+    try:
+        with open(f'/proc/{pid}/stat', 'r') as f:
+            start_ticks = f.read().rsplit(')', 1)[1].split()[19]
+    except (OSError, IndexError):
+        start_ticks = '0'
+    return f"{socket.gethostname()}:{pid}:{start_ticks}"
+
+def worker_alive(worker):
+    """Check whether the process that claimed a job is still running (only decidable on this host)"""
+    try:
+        host, pid, _ = worker.split(':')
+    except (AttributeError, ValueError):
+        return False
+    if host != socket.gethostname():
+        return True
+    return process_token(int(pid)) == worker
+
+def upload_part_path(upload_id):
+    """File that receives the chunks of a resumable upload"""
+    return os.path.join(UPLOAD_FOLDER, f"upload_{upload_id}.part")
+
+def blob_path(sha256):
+    """File of a blob in the content-addressed upload store"""
+    return os.path.join(CAS_FOLDER, sha256)
+
+def store_blob(part_path, sha256, size):
+    """
+    Move a finished upload into the content-addressed store.
+    
+    If the store already has the content, the upload is dropped instead.
+    """
+    now = time.time()
+    with job_transaction() as conn:
+        if conn.execute("SELECT 1 FROM blobs WHERE sha256 = ?", (sha256,)).fetchone() and os.path.exists(blob_path(sha256)):
+            os.remove(part_path)
+            conn.execute("UPDATE blobs SET last_used = ? WHERE sha256 = ?", (now, sha256))
+        else:
+            os.rename(part_path, blob_path(sha256))
+            conn.execute(
+                "INSERT OR REPLACE INTO blobs (sha256, size, refcount, created_at, last_used) VALUES (?, ?, 0, ?, ?)",
+                (sha256, size, now, now)
+            )
+
+def link_file(source_path, target_path):
+    """
+    Hard link a stored file to a new name, or copy it where hard links are not supported.
+    
+    The link gets the current time as mtime, so cleanup measures its age from now.
+    """
+    if os.path.exists(target_path):
+        os.remove(target_path)
     try:
-        status_data = {
-            'status': status,
-            'progress': progress,
-            'message': message,
-            'timestamp': datetime.now().isoformat()
+        os.link(source_path, target_path)
+    except OSError:
+        shutil.copyfile(source_path, target_path)
+    os.utime(target_path)
+
+def release_blobs(hashes):
+    """Drop the references a job holds on its input blobs"""
+    if not hashes:
+        return
+    with job_transaction() as conn:
+        for sha256 in hashes:
+            conn.execute(
+                "UPDATE blobs SET refcount = MAX(refcount - 1, 0), last_used = ? WHERE sha256 = ?",
+                (time.time(), sha256)
+            )
+
+def active_job_inputs():
+    """Input files of queued and running jobs, which cleanup must not delete"""
+    paths = set()
+    for row in job_db().execute("SELECT params FROM jobs WHERE status IN ('queued', 'processing')"):
+        params = json.loads(row['params'])
+        for path in [params.get('audio_path'), params.get('image_path'), *(params.get('audio_paths') or []), *(params.get('video_paths') or [])]:
+            if path:
+                paths.add(path)
+    return paths
+
+def get_upload(upload_id):
+    """Upload session row, or None"""
+    return job_db().execute("SELECT * FROM uploads WHERE upload_id = ?", (upload_id,)).fetchone()
+
+def write_upload_chunk(upload_id, offset, stream, length):
+    """
+    Append a chunk to a resumable upload.
+    
+    The size of the part file is the upload offset; an exclusive lock keeps
+    concurrent requests for the same upload apart.
+    
+    Returns:
+        (accepted, offset): accepted is False if offset does not match the upload offset
+    """
+    with open(upload_part_path(upload_id), 'r+b') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        current = os.fstat(f.fileno()).st_size
+        if offset != current:
+            return False, current
+        
+        with upload_hashers_lock:
+            hasher_offset, hasher = upload_hashers.pop(upload_id, (0, hashlib.sha256()))
+        if hasher_offset != offset:
+            # Earlier chunks went to another process: finalize rehashes the file
+            hasher = None
+        
+        f.seek(offset)
+        remaining = length
+        try:
+            while remaining > 0:
+                data = stream.read(min(ZIP_STREAM_CHUNK_SIZE, remaining))
+                if not data:
+                    break
+                f.write(data)
+                if hasher:
+                    hasher.update(data)
+                remaining -= len(data)
+        finally:
+            f.flush()
+            received = f.tell()
+            if hasher:
+                with upload_hashers_lock:
+                    upload_hashers[upload_id] = (received, hasher)
+            job_db().execute(
+                "UPDATE uploads SET received = ?, updated_at = ? WHERE upload_id = ?",
+                (received, time.time(), upload_id)
+            )
+    return True, received
+
+def file_sha256(file_path):
+    """SHA-256 of a file, read in chunks"""
+    hasher = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for data in iter(lambda: f.read(ZIP_STREAM_CHUNK_SIZE), b''):
+            hasher.update(data)
+    return hasher.hexdigest()
+
+def result_cache_key(input_hashes, mode, effect, trim_frames, seed, output_format=None, max_height=None, max_fps=None):
+    """
+    Key of a job result: same inputs (in order) and settings give the same output.
+    
+    The server settings that change the output bytes are part of the key, so results
+    made before a configuration change are not served afterwards.
+    """
+    settings = {
+        'inputs': input_hashes,
+        'mode': mode,
+        'effect': effect,
+        'trim_frames': trim_frames,
+        'seed': seed,
+        'output_format': output_format,
+        'max_height': max_height,
+        'max_fps': max_fps,
+        'config': {
+            'effect_filter': VIDEO_EFFECTS.get(effect, {}).get('filter'),
+            'x264': x264_encode_args(),
+            'audio_bitrate': AUDIO_BITRATE,
+            'mp4_copy_audio_codecs': MP4_COPY_AUDIO_CODECS,
+            'trim_mode': TRIM_MODE,
+            'segment_duration': SEGMENT_DURATION,
+            'still_image': [STILL_IMAGE_FRAME_RATE, STILL_IMAGE_LOOP_SECONDS],
+            'effect_loop_min_seconds': EFFECT_LOOP_MIN_SECONDS
         }
-        if data:
-            status_data.update(data)
-        
-        with open(status_path, 'w') as f:
-            json.dump(status_data, f)
+    }
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode('utf-8')).hexdigest()
+
+def result_cache_paths(cache_key, output_ext):
+    """Cached output and tracklist files of a cache key"""
+    base = os.path.join(RESULT_CACHE_FOLDER, cache_key)
+    return f"{base}{output_ext}", f"{base}_tracklist.txt"
+
+def lookup_result(cache_key, file_id, output_path):
+    """
+    Link a cached result to a new job's output and tracklist.
+    
+    Returns:
+        Status fields of the cached job, or None on a cache miss
+    """
+    if RESULT_CACHE_MAX_BYTES <= 0:
+        return None
+    with job_transaction() as conn:
+        row = conn.execute("SELECT * FROM results WHERE cache_key = ?", (cache_key,)).fetchone()
+        if not row:
+            return None
+        cached_output, cached_tracklist = result_cache_paths(cache_key, row['output_ext'])
+        if not os.path.exists(cached_output) or (row['has_tracklist'] and not os.path.exists(cached_tracklist)):
+            conn.execute("DELETE FROM results WHERE cache_key = ?", (cache_key,))
+            return None
+        # Linking inside the transaction keeps eviction from removing the files meanwhile
+        link_file(cached_output, output_path)
+        if row['has_tracklist']:
+            link_file(cached_tracklist, os.path.join(OUTPUT_FOLDER, f"{file_id}_tracklist.txt"))
+        conn.execute("UPDATE results SET last_used = ? WHERE cache_key = ?", (time.time(), cache_key))
+    return json.loads(row['data'])
+
+def store_result(cache_key, output_path, tracklist_path, data):
+    """Add a finished job's output and tracklist to the result cache, then evict down to RESULT_CACHE_MAX_BYTES"""
+    if RESULT_CACHE_MAX_BYTES <= 0 or not cache_key:
+        return
+    output_ext = os.path.splitext(output_path)[1]
+    cached_output, cached_tracklist = result_cache_paths(cache_key, output_ext)
+    size = os.path.getsize(output_path) + (os.path.getsize(tracklist_path) if tracklist_path else 0)
+    if size > RESULT_CACHE_MAX_BYTES:
+        return
+    now = time.time()
+    with job_transaction() as conn:
+        if conn.execute("SELECT 1 FROM results WHERE cache_key = ?", (cache_key,)).fetchone():
+            conn.execute("UPDATE results SET last_used = ? WHERE cache_key = ?", (now, cache_key))
+            return
+        link_file(output_path, cached_output)
+        if tracklist_path:
+            link_file(tracklist_path, cached_tracklist)
+        conn.execute(
+            "INSERT INTO results (cache_key, output_ext, has_tracklist, size, data, created_at, last_used) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (cache_key, output_ext, 1 if tracklist_path else 0, size, json.dumps(data), now, now)
+        )
+    evict_results()
+
+def evict_results():
+    """Delete least recently used results until the cache fits RESULT_CACHE_MAX_BYTES"""
+    with job_transaction() as conn:
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= RESULT_CACHE_MAX_BYTES:
+            return
+        for row in conn.execute("SELECT cache_key, output_ext, size FROM results ORDER BY last_used").fetchall():
+            conn.execute("DELETE FROM results WHERE cache_key = ?", (row['cache_key'],))
+            for path in result_cache_paths(row['cache_key'], row['output_ext']):
+                if os.path.exists(path):
+                    os.remove(path)
+            total -= row['size']
+            print(f"[Cache] Evicted result {row['cache_key'][:12]} ({format_size(row['size'])})")
+            if total <= RESULT_CACHE_MAX_BYTES:
+                break
+
+def complete_cached_job(job_id, info, data):
+    """Record a job that was served from the result cache as complete"""
+    now = time.time()
+    job_db().execute(
+        "INSERT INTO jobs (job_id, status, progress, message, info, data, params, created_at, started_at, updated_at) VALUES (?, 'complete', 100, ?, ?, ?, '{}', ?, ?, ?)",
+        (job_id, 'Video erfolgreich erstellt!', json.dumps(info), json.dumps(data), now, now, now)
+    )
+
+def claim_upload(upload_id, target_base):
+    """
+    Link a finalized upload to a job's input file; an upload can only be used once.
+    
+    The job input is a hard link to the blob, and the job holds a reference on the
+    blob until it is done (see release_blobs), so cleanup keeps blobs of queued jobs.
+    
+    Args:
+        upload_id: ID of a finalized upload
+        target_base: Path of the job input without extension
+    
+    Returns:
+        (path, sha256): Path of the job input and the blob it references
+    """
+    with job_transaction() as conn:
+        row = conn.execute("SELECT * FROM uploads WHERE upload_id = ? AND status = 'complete'", (upload_id,)).fetchone()
+        if not row:
+            raise ValueError(f"Upload nicht gefunden: {upload_id}")
+        referenced = conn.execute(
+            "UPDATE blobs SET refcount = refcount + 1, last_used = ? WHERE sha256 = ?",
+            (time.time(), row['sha256'])
+        ).rowcount
+        if not referenced:
+            raise ValueError(f"Upload nicht gefunden: {upload_id}")
+        conn.execute("DELETE FROM uploads WHERE upload_id = ?", (upload_id,))
+    target_path = f"{target_base}{os.path.splitext(row['filename'])[1]}"
+    try:
+        link_file(blob_path(row['sha256']), target_path)
+    except Exception:
+        release_blobs([row['sha256']])
+        raise
+    return target_path, row['sha256']
+
+def start_job_workers():
+    """Start the job worker threads of this process"""
+    with job_condition:
+        while len(job_workers) < MAX_CONCURRENT_JOBS:
+            worker = threading.Thread(target=job_worker, daemon=True)
+            job_workers.append(worker)
+            worker.start()
+
+def job_worker():
+    """Claim queued jobs from the job database and run them"""
+    while True:
+        try:
+            job = claim_next_job()
+        except Exception as e:
+            print(f"[Queue] Claim error: {e}")
+            job = None
+        if not job:
+            with job_condition:
+                job_condition.wait(JOB_POLL_INTERVAL)
+            continue
+        
+        print(f"[Queue] Starting job {job['job_id']}")
+        try:
+            process_video_background(**json.loads(job['params']))
+        finally:
+            with job_condition:
+                job_condition.notify_all()
+
+def claim_next_job():
+    """
+    Atomically move the oldest queued job to 'processing' if a slot is free.
+    
+    Jobs left in 'processing' by a process that no longer runs are failed first.
+    MAX_CONCURRENT_JOBS applies to all processes sharing the database.
+    
+    Returns:
+        Claimed job row, or None
+    """
+    worker = process_token(os.getpid())
+    now = time.time()
+    with job_transaction() as conn:
+        running = conn.execute("SELECT job_id, worker, params FROM jobs WHERE status = 'processing'").fetchall()
+        for row in running:
+            if not worker_alive(row['worker']):
+                print(f"[Queue] Job {row['job_id']} lost its worker, marking as failed")
+                conn.execute(
+                    "UPDATE jobs SET status = 'error', progress = 0, message = ?, data = '{}', version = version + 1, updated_at = ? WHERE job_id = ?",
+                    ('Fehler: Verarbeitung wurde unterbrochen', now, row['job_id'])
+                )
+                for sha256 in json.loads(row['params']).get('blobs') or []:
+                    conn.execute("UPDATE blobs SET refcount = MAX(refcount - 1, 0), last_used = ? WHERE sha256 = ?", (now, sha256))
+        running_count = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'processing'").fetchone()[0]
+        if running_count >= MAX_CONCURRENT_JOBS:
+            return None
+        job = conn.execute("SELECT * FROM jobs WHERE status = 'queued' ORDER BY created_at, rowid LIMIT 1").fetchone()
+        if not job:
+            return None
+        conn.execute(
+            "UPDATE jobs SET status = 'processing', message = 'Verarbeitung startet...', data = '{}', worker = ?, started_at = ?, version = version + 1, updated_at = ? WHERE job_id = ? AND status = 'queued'",
+            (worker, now, now, job['job_id'])
+        )
+        return job
+
+def submit_job(job_id, params, info, media_duration):
+    """
+    Add a job to the queue.
+    
+    Args:
+        job_id: Job ID (file_id)
+        params: Keyword arguments for process_video_background (JSON serializable)
+        info: Status fields reported for the whole job (file_id, mode, effect, ...)
+        media_duration: Output duration in seconds, used for start time estimates
+    
+    Returns:
+        Dict with queue_position and estimated_start_seconds, or None if the queue is full
+    """
+    now = time.time()
+    with job_transaction() as conn:
+        queued_count = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+        if queued_count >= MAX_QUEUED_JOBS:
+            return None
+        conn.execute(
+            "INSERT INTO jobs (job_id, status, progress, message, info, params, media_duration, created_at, updated_at) VALUES (?, 'queued', 0, ?, ?, ?, ?, ?, ?)",
+            (job_id, 'In Warteschlange...', json.dumps(info), json.dumps(params), media_duration or 0, now, now)
+        )
+        queue_info = queue_estimates(conn).get(job_id)
+    with job_condition:
+        job_condition.notify_all()
+    return queue_info
+
+def calibrate_effects():
+    """
+    Measure how fast this machine renders every entry in VIDEO_EFFECTS.
+    
+    A synthetic clip (testsrc2, CALIBRATION_SIZE at IMAGE_FRAME_RATE) goes through each
+    effect and the H.264 encoder; the speed is stored as frames per second at one
+    megapixel (fps_per_mpx) in EFFECT_COSTS_PATH, together with the speed of the audio
+    pass (silencedetect decode) and of the MP3 encode in media seconds per second.
+    
+    Returns:
+        The stored catalog
+    """
+    width, height = CALIBRATION_SIZE
+    megapixels = width * height / 1e6
+    frames = CALIBRATION_SECONDS * IMAGE_FRAME_RATE
+    source = ['-f', 'lavfi', '-i', f'testsrc2=size={width}x{height}:rate={IMAGE_FRAME_RATE}:duration={CALIBRATION_SECONDS}']
+    
+    def timed(cmd):
+        start = time.time()
+        result = run_ffmpeg(cmd, timeout=1800)
+        if result.returncode != 0:
+            raise Exception(result.stderr[-200:])
+        return max(time.time() - start, 0.001)
+    
+    effects = {}
+    for effect, config in VIDEO_EFFECTS.items():
+        filter_args = ['-vf', config['filter']] if config['filter'] else []
+        try:
+            elapsed = timed(['ffmpeg', *source, *filter_args, '-frames:v', str(frames), *x264_encode_args(), '-threads', '0', '-f', 'null', '-'])
+        except Exception as e:
+            print(f"[Calibrate] {effect}: failed ({e})")
+            continue
+        effects[effect] = round(frames / elapsed * megapixels, 2)
+        print(f"[Calibrate] {effect}: {frames / elapsed:.1f} fps at {width}x{height} ({effects[effect]} fps per megapixel)")
+    
+    audio_seconds = 120
+    audio_path = os.path.join(UPLOAD_FOLDER, 'calibration_audio.mp3')
+    try:
+        encode_elapsed = timed(['ffmpeg', '-y', '-f', 'lavfi', '-i', f'sine=frequency=440:sample_rate=44100:duration={audio_seconds}',
+                                '-ac', '2', *AUDIO_MERGE_FORMATS['mp3']['encode_args'], audio_path])
+        decode_elapsed = timed(['ffmpeg', '-i', audio_path, '-af', silence_detect_filter(), '-f', 'null', '-'])
+    finally:
+        if os.path.exists(audio_path):
+            os.remove(audio_path)
+    
+    catalog = {
+        'calibrated_at': datetime.now().isoformat(),
+        'cpu_count': os.cpu_count(),
+        'effects': effects,
+        'audio_decode_speed': round(audio_seconds / decode_elapsed, 1),
+        'audio_encode_speed': round(audio_seconds / encode_elapsed, 1)
+    }
+    print(f"[Calibrate] Audio: decode {catalog['audio_decode_speed']}x, MP3 encode {catalog['audio_encode_speed']}x realtime")
+    temp_path = f"{EFFECT_COSTS_PATH}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(catalog, f, indent=2)
+    os.replace(temp_path, EFFECT_COSTS_PATH)
+    print(f"[Calibrate] {len(effects)} effect(s) written to {EFFECT_COSTS_PATH}")
+    return catalog
+
+def effect_costs():
+    """Calibrated cost catalog (reloaded when the file changes), or {} before a calibration"""
+    try:
+        return _load_effect_costs(os.stat(EFFECT_COSTS_PATH).st_mtime_ns)
+    except OSError:
+        return {}
+
+@lru_cache(maxsize=1)
+def _load_effect_costs(mtime_ns):
+    """Read the cost catalog (cached per file version)"""
+    try:
+        with open(EFFECT_COSTS_PATH, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Error reading {EFFECT_COSTS_PATH}: {e}")
+        return {}
+
+def estimate_processing_seconds(mode, effect, media_duration, video_paths=None, image_path=None, max_height=DEFAULT_MAX_HEIGHT, max_fps=DEFAULT_MAX_FPS, audio_paths=None, audio_format='mp3'):
+    """
+    Expected processing time of a job from the calibrated cost catalog.
+    
+    Counts the frames the job's encode path actually renders (none for a stream-copy
+    concat, one loop clip for still images and periodic effects) at the measured speed
+    of the effect and the output size under the cap, plus the audio pass. Audio merges
+    only count the inputs audio_merge_plan() transcodes (AUDIO_MERGE_WORKERS in parallel).
+    
+    Returns:
+        Seconds, or None without a calibration (ESTIMATED_ENCODE_SPEED is used then)
+    """
+    costs = effect_costs()
+    if not costs:
+        return None
+    duration = media_duration or 0
+    if mode == 'audio':
+        _, actions = audio_merge_plan(audio_paths, audio_format)
+        transcoded = [path for path, action in zip(audio_paths, actions) if action == 'transcode']
+        if not transcoded:
+            return 0.0
+        workers = min(AUDIO_MERGE_WORKERS, len(transcoded))
+        return sum(get_video_duration(path) for path in transcoded) / costs['audio_encode_speed'] / workers
+    audio_seconds = duration / costs['audio_decode_speed']
+    if mode == 'tracklist':
+        return audio_seconds
+    
+    fps_per_mpx = costs['effects'].get(effect) or costs['effects'].get('none')
+    if not fps_per_mpx:
+        return None
+    info = probe_media(image_path if mode == 'image' else video_paths[0]) or {}
+    width = info.get('width') or CALIBRATION_SIZE[0]
+    height = info.get('height') or CALIBRATION_SIZE[1]
+    width, height = delivery_size(width, height, max_height) or (width, height)
+    megapixels = width * height / 1e6
+    if mode == 'image':
+        frame_rate = min(IMAGE_FRAME_RATE, max_fps) if max_fps else IMAGE_FRAME_RATE
+        loop_window = effect_loop_window(effect, math.gcd(IMAGE_FRAME_RATE, frame_rate))
+        if not VIDEO_EFFECTS[effect]['filter']:
+            frames = STILL_IMAGE_FRAME_RATE * min(STILL_IMAGE_LOOP_SECONDS, duration)
+        elif loop_window and duration > loop_window:
+            frames = float(loop_window) * frame_rate
+        else:
+            frames = duration * frame_rate
+    elif effect == 'none' and not delivery_filters(video_paths, max_height, max_fps) and can_concat_copy(video_paths):
+        frames = 0
+    else:
+        frame_rate = info.get('fps') or IMAGE_FRAME_RATE
+        frames = duration * (min(frame_rate, max_fps) if max_fps else frame_rate)
+    return frames * megapixels / fps_per_mpx + audio_seconds
+
+def estimated_job_seconds(media_duration, estimated_seconds=None):
+    """Estimated processing time of a job in seconds (calibrated estimate if there is one)"""
+    if estimated_seconds is not None:
+        return estimated_seconds
+    return (media_duration or 0) / ESTIMATED_ENCODE_SPEED
+
+def queue_estimates(conn):
+    """
+    Estimate queue position and start time of every queued job.
+    
+    Running jobs free their slot after their reported ETA (or their calibrated estimate,
+    or the estimate from ESTIMATED_ENCODE_SPEED), queued jobs start in creation order.
+    
+    Returns:
+        Dict mapping job_id to {'queue_position', 'estimated_start_seconds'}
+    """
+    now = time.time()
+    free_at = []
+    for row in conn.execute("SELECT info, data, media_duration, started_at FROM jobs WHERE status = 'processing'"):
+        eta_seconds = json.loads(row['data']).get('eta_seconds')
+        if eta_seconds is None:
+            estimate = estimated_job_seconds(row['media_duration'], json.loads(row['info']).get('estimated_seconds'))
+            eta_seconds = max(0, estimate - (now - (row['started_at'] or now)))
+        free_at.append(eta_seconds)
+    free_at.extend([0] * max(0, MAX_CONCURRENT_JOBS - len(free_at)))
+    heapq.heapify(free_at)
+    
+    estimates = {}
+    queued = conn.execute("SELECT job_id, info, media_duration FROM jobs WHERE status = 'queued' ORDER BY created_at, rowid")
+    for position, row in enumerate(queued, start=1):
+        start = heapq.heappop(free_at)
+        estimates[row['job_id']] = {'queue_position': position, 'estimated_start_seconds': int(start)}
+        heapq.heappush(free_at, start + estimated_job_seconds(row['media_duration'], json.loads(row['info']).get('estimated_seconds')))
+    return estimates
+
+def queue_retry_after():
+    """
+    Check admission for a new job.
+    
+    Returns:
+        None if the job can be queued, otherwise the seconds until a queue slot is expected to free up
+    """
+    conn = job_db()
+    queued_count = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+    if queued_count < MAX_QUEUED_JOBS:
+        return None
+    estimates = queue_estimates(conn)
+    first_start = min((e['estimated_start_seconds'] for e in estimates.values()), default=0)
+    return max(30, first_start)
+
+def queue_full_response(retry_after):
+    """503 response for uploads rejected by admission control"""
+    response = jsonify({
+        'success': False,
+        'error': f'Server ausgelastet - bitte in {max(1, round(retry_after / 60))} Min erneut versuchen',
+        'retry_after': retry_after
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+def update_status(job_id, status, progress, message, data=None):
+    """
+    Update the status of a job in one atomic statement.
+    
+    data replaces the stage-specific status fields. Jobs that already finished
+    ('complete' or 'error') are not changed.
+    """
+    try:
+        job_db().execute(
+            "UPDATE jobs SET status = ?, progress = ?, message = ?, data = ?, version = version + 1, updated_at = ? WHERE job_id = ? AND status NOT IN ('complete', 'error')",
+            (status, progress, message, json.dumps(data or {}), time.time(), job_id)
+        )
     except Exception as e:
         print(f"Error updating status: {e}")
 
+def job_status(row, estimates=None):
+    """Status dict of a job row as reported by /status"""
+    status_data = {
+        **json.loads(row['info']),
+        **json.loads(row['data']),
+        'status': row['status'],
+        'progress': row['progress'],
+        'message': row['message'],
+        'version': row['version'],
+        'timestamp': datetime.fromtimestamp(row['updated_at']).isoformat()
+    }
+    if row['status'] == 'queued' and estimates and row['job_id'] in estimates:
+        estimate = estimates[row['job_id']]
+        wait_seconds = estimate['estimated_start_seconds']
+        wait_text = f', Start in ~{round(wait_seconds / 60)} Min' if wait_seconds >= 60 else ''
+        status_data.update(estimate)
+        status_data['estimated_start'] = (datetime.now() + timedelta(seconds=wait_seconds)).isoformat()
+        status_data['message'] = f"In Warteschlange (Position {estimate['queue_position']}{wait_text})..."
+    elif row['status'] == 'processing' and 'eta_seconds' not in status_data and status_data.get('estimated_seconds') is not None:
+        # No ffmpeg progress yet: remaining time from the calibrated estimate
+        status_data['eta_seconds'] = int(max(0, status_data['estimated_seconds'] - (time.time() - (row['started_at'] or time.time()))))
+    return status_data
+
 @app.route('/status/<job_id>')
 def get_status(job_id):
     """Get processing status"""
     try:
-        status_path = os.path.join(OUTPUT_FOLDER, f"{job_id}_status.json")
+        conn = job_db()
+        row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
         
-        if not os.path.exists(status_path):
+        if not row:
             return jsonify({
                 'success': False,
                 'error': 'Job not found'
             }), 404
         
-        with open(status_path, 'r') as f:
-            status_data = json.load(f)
+        # Queue position and start estimate move with the jobs ahead
+        estimates = queue_estimates(conn) if row['status'] == 'queued' else None
         
         return jsonify({
             'success': True,
-            **status_data
+            **job_status(row, estimates)
         })
         
     except Exception as e:
@@ -1962,59 +4728,153 @@ def get_status(job_id):
             'error': str(e)
         }), 500
 
+@app.route('/status/<job_id>/stream')
+def stream_status(job_id):
+    """
+    Stream status changes as server-sent events.
+    
+    Every event carries the job version as its ID. A reconnecting client sends it
+    back as Last-Event-ID (or ?since=<version>) and only receives newer states. The
+    stream ends after the job finished or after STATUS_STREAM_MAX_SECONDS.
+    """
+    row = job_db().execute("SELECT version FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+    if not row:
+        return jsonify({
+            'success': False,
+            'error': 'Job not found'
+        }), 404
+    
+    cursor = request.headers.get('Last-Event-ID') or request.args.get('since') or '0'
+    try:
+        since_version = int(cursor)
+    except ValueError:
+        since_version = 0
+    
+    def events():
+        last_sent = None
+        last_write = time.time()
+        stream_end = last_write + STATUS_STREAM_MAX_SECONDS
+        # Reconnect delay in milliseconds
+        yield "retry: 2000\n\n"
+        while time.time() < stream_end:
+            conn = job_db()
+            row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if not row:
+                return
+            estimates = queue_estimates(conn) if row['status'] == 'queued' else None
+            status_data = job_status(row, estimates)
+            # Queued jobs also change when the jobs ahead of them move on
+            state = (row['version'], status_data.get('queue_position'), status_data.get('estimated_start_seconds'))
+            if state != last_sent and (row['version'] > since_version or row['status'] == 'queued'):
+                last_sent = state
+                last_write = time.time()
+                yield f"id: {row['version']}\nevent: status\ndata: {json.dumps({'success': True, **status_data})}\n\n"
+            if row['status'] in ('complete', 'error'):
+                return
+            if time.time() - last_write >= STATUS_STREAM_KEEPALIVE:
+                last_write = time.time()
+                yield ": keep-alive\n\n"
+            time.sleep(STATUS_STREAM_POLL_INTERVAL)
+    
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+@app.route('/jobs')
+def list_jobs():
+    """List active and queued jobs (without job IDs, which grant download access)"""
+    try:
+        conn = job_db()
+        estimates = queue_estimates(conn)
+        rows = conn.execute(
+            "SELECT * FROM jobs WHERE status IN ('processing', 'queued') ORDER BY status = 'queued', created_at, rowid"
+        ).fetchall()
+        jobs = []
+        for row in rows:
+            status_data = job_status(row, estimates)
+            jobs.append({
+                key: status_data[key]
+                for key in ('status', 'progress', 'mode', 'effect', 'queue_position', 'estimated_start_seconds', 'estimated_seconds', 'eta_seconds')
+                if key in status_data
+            })
+            jobs[-1]['created_at'] = datetime.fromtimestamp(row['created_at']).isoformat()
+        return jsonify({
+            'success': True,
+            'processing': sum(1 for row in rows if row['status'] == 'processing'),
+            'queued': sum(1 for row in rows if row['status'] == 'queued'),
+            'max_concurrent_jobs': MAX_CONCURRENT_JOBS,
+            'max_queued_jobs': MAX_QUEUED_JOBS,
+            'jobs': jobs
+        })
+    except Exception as e:
+        print(f"Job list error: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+def audio_output_path(file_id):
+    """Output of an audio merge job in whichever format it was made, or None"""
+    for audio_format in AUDIO_MERGE_FORMATS:
+        path = os.path.join(OUTPUT_FOLDER, f"{file_id}.{audio_format}")
+        if os.path.exists(path):
+            return path
+    return None
+
+def output_mimetype(file_path):
+    """MIME type of a job output"""
+    audio_format = os.path.splitext(file_path)[1].lstrip('.')
+    return AUDIO_MERGE_FORMATS[audio_format]['mimetype'] if audio_format in AUDIO_MERGE_FORMATS else 'video/mp4'
+
 @app.route('/download/<file_id>')
 def download(file_id):
     """Download merged output and tracklist as ZIP"""
     try:
         mp4_path = os.path.join(OUTPUT_FOLDER, f"{file_id}.mp4")
-        mp3_path = os.path.join(OUTPUT_FOLDER, f"{file_id}.mp3")
         tracklist_path = os.path.join(OUTPUT_FOLDER, f"{file_id}_tracklist.txt")
 
-        file_path = mp3_path if os.path.exists(mp3_path) else mp4_path if os.path.exists(mp4_path) else None
+        file_path = audio_output_path(file_id) or (mp4_path if os.path.exists(mp4_path) else None)
         if not file_path:
             return "Datei nicht gefunden oder abgelaufen", 404
 
+        bundle_path = os.path.join(OUTPUT_FOLDER, f"{file_id}_bundle.zip")
+        if os.path.exists(bundle_path):
+            return send_output_file(bundle_path, 'application/zip', f'output_with_tracklist_{file_id}.zip')
+        
         has_tracklist = os.path.exists(tracklist_path)
         if has_tracklist:
-            print(f"[Download] Creating ZIP for {file_id} with output and tracklist")
-            zip_buffer = BytesIO()
-            with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                arcname = os.path.basename(file_path)
-                zip_file.write(file_path, arcname=f"merged_{file_id}{os.path.splitext(file_path)[1]}")
-                zip_file.write(tracklist_path, arcname=f"tracklist_{file_id}.txt")
-            zip_buffer.seek(0)
-            return send_file(
-                zip_buffer,
+            # Jobs finished without a pre-built bundle
+            print(f"[Download] Streaming ZIP for {file_id} with output and tracklist")
+            entries = stored_zip_entries(bundle_files(file_id, file_path, tracklist_path))
+            return Response(
+                stream_with_context(stream_stored_zip(entries)),
                 mimetype='application/zip',
-                as_attachment=True,
-                download_name=f'output_with_tracklist_{file_id}.zip'
+                headers={
+                    'Content-Length': str(stored_zip_size(entries)),
+                    'Content-Disposition': f'attachment; filename=output_with_tracklist_{file_id}.zip'
+                }
             )
 
-        mimetype = 'audio/mpeg' if file_path.endswith('.mp3') else 'video/mp4'
+        mimetype = output_mimetype(file_path)
         download_name = f"merged_output_{file_id}{os.path.splitext(file_path)[1]}"
-        return send_file(
-            file_path,
-            mimetype=mimetype,
-            as_attachment=True,
-            download_name=download_name
-        )
+        return send_output_file(file_path, mimetype, download_name)
     except Exception as e:
         print(f"Download error: {e}")
         return "Error downloading file", 500
 
 @app.route('/download-audio/<file_id>')
 def download_audio(file_id):
-    """Download only the MP3 audio file"""
+    """Download only the merged audio file (MP3 or M4A)"""
     try:
-        audio_path = os.path.join(OUTPUT_FOLDER, f"{file_id}.mp3")
-        if not os.path.exists(audio_path):
+        audio_path = audio_output_path(file_id)
+        if not audio_path:
             return "Datei nicht gefunden oder abgelaufen", 404
-        return send_file(
-            audio_path,
-            mimetype='audio/mpeg',
-            as_attachment=True,
-            download_name=f'merged_audio_{file_id}.mp3'
-        )
+        return send_output_file(audio_path, output_mimetype(audio_path), f'merged_audio_{file_id}{os.path.splitext(audio_path)[1]}')
     except Exception as e:
         print(f"Download error: {e}")
         return "Error downloading file", 500
@@ -2028,12 +4888,7 @@ def download_video(file_id):
         if not os.path.exists(video_path):
             return "File not found or expired", 404
         
-        return send_file(
-            video_path,
-            mimetype='video/mp4',
-            as_attachment=True,
-            download_name=f'merged_video_{file_id}.mp4'
-        )
+        return send_output_file(video_path, 'video/mp4', f'merged_video_{file_id}.mp4')
     except Exception as e:
         print(f"Download error: {e}")
         return "Error downloading file", 500
@@ -2047,12 +4902,7 @@ def download_tracklist(file_id):
         if not os.path.exists(tracklist_path):
             return "Tracklist not found", 404
         
-        return send_file(
-            tracklist_path,
-            mimetype='text/plain',
-            as_attachment=True,
-            download_name=f'tracklist_{file_id}.txt'
-        )
+        return send_output_file(tracklist_path, 'text/plain', f'tracklist_{file_id}.txt')
     except Exception as e:
         print(f"Download error: {e}")
         return "Error downloading file", 500
@@ -2062,7 +4912,17 @@ def health():
     """Health check endpoint"""
     return jsonify({'status': 'healthy', 'service': 'video-audio-merger'})
 
+# Job database and queue workers (per process, so every gunicorn worker runs jobs).
+# A calibration run shares the job database of a live server and must not claim its jobs.
+init_job_db()
+if '--calibrate' not in sys.argv:
+    start_job_workers()
+
 if __name__ == '__main__':
+    if '--calibrate' in sys.argv:
+        calibrate_effects()
+        sys.exit(0)
+    
     # Start cleanup thread
     cleanup_thread = threading.Thread(target=cleanup_old_files, daemon=True)
     cleanup_thread.start()